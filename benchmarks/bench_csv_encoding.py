@@ -0,0 +1,77 @@
+"""Compare the old trial-parse encoding loop with sampled detection plus a single read_csv.
+
+Generates a GBK-encoded CSV whose non-ASCII rows start late in the file, so the old loop's
+utf-8 attempt parses most of the file before failing, and times both paths.
+Run from the project root: python benchmarks/bench_csv_encoding.py --rows 500000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_utils import detect_csv_encoding, read_csv_bytes
+
+OLD_ENCODINGS = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig', 'cp936', 'latin1']
+
+
+def gbk_csv(rows, ascii_fraction, rng):
+    cities = np.array(["北京", "上海", "广州", "深圳", "杭州"])
+    city = cities[rng.integers(0, len(cities), rows)].astype(object)
+    city[:int(rows * ascii_fraction)] = "unknown"
+    df = pd.DataFrame({
+        "order_id": np.arange(rows),
+        "city": city,
+        "amount": rng.random(rows).round(2) * 1000,
+    })
+    return df.to_csv(index=False).encode("gbk")
+
+
+def trial_parse(data):
+    """The previous Workspace import: a full read_csv per candidate encoding until one succeeds"""
+    for encoding in OLD_ENCODINGS:
+        try:
+            return pd.read_csv(io.BytesIO(data), encoding=encoding), encoding
+        except (UnicodeDecodeError, pd.errors.ParserError):
+            continue
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ascii-fraction", type=float, default=0.9,
+                        help="leading share of rows without Chinese text")
+    args = parser.parse_args()
+
+    data = gbk_csv(args.rows, args.ascii_fraction, np.random.default_rng(42))
+    print(f"{args.rows:,} rows, {len(data) / 1024 ** 2:.1f} MB GBK CSV")
+
+    detect_seconds, encoding = timed(lambda: detect_csv_encoding(data), args.repeat)
+    baseline, _ = timed(lambda: pd.read_csv(io.BytesIO(data), encoding="gbk"), args.repeat)
+    old, (_, old_encoding) = timed(lambda: trial_parse(data), args.repeat)
+    new, (_, new_encoding) = timed(lambda: read_csv_bytes(data), args.repeat)
+
+    print(f"{'path':<28}{'seconds':>10}{'encoding':>10}")
+    print(f"{'single read_csv (known)':<28}{baseline:>10.3f}{'gbk':>10}")
+    print(f"{'trial-parse loop':<28}{old:>10.3f}{old_encoding:>10}")
+    print(f"{'sampled detect + read_csv':<28}{new:>10.3f}{new_encoding:>10}")
+    print(f"detection alone: {detect_seconds * 1000:.2f} ms ({encoding})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Recall@k and latency of dense, BM25 and hybrid retrieval on the local ops fixture corpus.
+
+Run from the project root: python benchmarks/bench_hybrid_retrieval.py --k 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain.docstore.document import Document
+from langchain.vectorstores import FAISS
+from utils.hybrid_retriever import HybridRetriever, dense_search, get_bm25_index
+from utils.model_registry import get_embeddings
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def evaluate(name, search_fn, queries, k):
+    hits = 0
+    latencies = []
+    for query, relevant in zip(queries["query"], queries["relevant_doc_id"]):
+        start = time.perf_counter()
+        doc_ids = search_fn(query)[:k]
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += int(relevant) in doc_ids
+    latencies = pd.Series(latencies)
+    print(f"{name:<8} recall@{k}={hits / len(queries):.3f}  "
+          f"p50={latencies.quantile(0.5):.2f}ms  p95={latencies.quantile(0.95):.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--alpha", type=float, default=0.5)
+    args = parser.parse_args()
+
+    corpus = pd.read_csv(os.path.join(FIXTURES, "ops_corpus.csv"))
+    queries = pd.read_csv(os.path.join(FIXTURES, "ops_queries.csv"))
+    docs = [Document(page_content=text, metadata={"doc_id": int(doc_id)})
+            for doc_id, text in zip(corpus["doc_id"], corpus["text"])]
+
+    start = time.perf_counter()
+    db = FAISS.from_documents(docs, get_embeddings())
+    bm25 = get_bm25_index(db)
+    print(f"Indexed {len(docs)} documents in {time.perf_counter() - start:.2f}s, {len(queries)} queries")
+
+    def doc_ids(positions):
+        return [db.docstore.search(db.index_to_docstore_id[p]).metadata["doc_id"] for p in positions]
+
+    def top(scores):
+        return [p for p, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)]
+
+    hybrid = HybridRetriever(vectorstore=db, bm25=bm25, k=args.k, fetch_k=args.fetch_k, alpha=args.alpha)
+    evaluate("dense", lambda q: doc_ids(top(dense_search(db, q, args.fetch_k))), queries, args.k)
+    evaluate("bm25", lambda q: doc_ids(p for p, _ in bm25.search(q, args.fetch_k)), queries, args.k)
+    evaluate("hybrid", lambda q: doc_ids(p for p, _ in hybrid.fused_scores(q)), queries, args.k)
+
+if __name__ == "__main__":
+    main()
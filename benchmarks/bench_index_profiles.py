@@ -0,0 +1,68 @@
+"""Compare Flat, HNSW and IVF-PQ FAISS indexes on synthetic embeddings.
+
+Reports build time, index size, query latency and recall@k against exact Flat search.
+Run from the project root: python benchmarks/bench_index_profiles.py --vectors 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+import faiss
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.index_profiles import PROFILES, MAX_TRAIN_VECTORS, create_index
+
+
+def synthetic_embeddings(count, dim, clusters, rng):
+    """Unit vectors drawn around random centroids, roughly like sentence embeddings of a topical corpus"""
+    centroids = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    vectors = centroids[labels] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectors = synthetic_embeddings(args.vectors + args.queries, args.dim, args.clusters, rng)
+    base, queries = vectors[:args.vectors], vectors[args.vectors:]
+    print(f"{args.vectors:,} vectors x {args.dim} dims, {args.queries} queries, k={args.k}")
+
+    ground_truth = None
+    for profile in PROFILES:
+        start = time.perf_counter()
+        train = base[rng.choice(len(base), size=min(len(base), MAX_TRAIN_VECTORS), replace=False)] if profile == "ivfpq" else None
+        index = create_index(profile, args.dim, train)
+        index.add(base)
+        build_time = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / 1024 ** 2
+
+        latencies = []
+        results = []
+        for query in queries:
+            start = time.perf_counter()
+            _, ids = index.search(query[None, :], args.k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append(ids[0])
+        results = np.array(results)
+        if ground_truth is None:
+            ground_truth = results
+        recall = np.mean([len(set(r) & set(g)) / args.k for r, g in zip(results, ground_truth)])
+        print(f"{profile:<6} build={build_time:7.2f}s  size={size_mb:8.1f}MB  "
+              f"p50={np.percentile(latencies, 50):6.3f}ms  p95={np.percentile(latencies, 95):6.3f}ms  "
+              f"recall@{args.k}={recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
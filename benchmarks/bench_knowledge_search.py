@@ -0,0 +1,113 @@
+"""Time the Knowledge search query against the 50 ms target on a synthetic corpus.
+
+Builds TEMP copies of knowledgeoverviews/knowledgecontents (same generated searchvector columns and
+GIN indexes as set_database.txt) filled with Zipf-like text, so common terms match a large share of
+parts, then times SEARCH_QUERY for common, medium and rare terms with and without the content cap.
+The database URL is read from [connections.postgresql] in .streamlit/secrets.toml unless --url is given.
+Run from the project root: python benchmarks/bench_knowledge_search.py --parts 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.sql import text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.bench_project_archive import database_url
+from utils.knowledge_search import MAX_CONTENT_MATCHES, SEARCH_QUERY, search_params
+
+TARGET_MS = 50
+
+SCHEMA = """
+CREATE TEMP TABLE knowledgeoverviews (
+    knowlid INTEGER PRIMARY KEY,
+    typeid INTEGER,
+    knowltitle VARCHAR,
+    versionnum INTEGER,
+    searchvector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(knowltitle, '')), 'A')
+    ) STORED
+);
+CREATE TEMP TABLE knowledgecontents (
+    knowlid INTEGER,
+    partnum INTEGER,
+    title VARCHAR,
+    content VARCHAR,
+    searchvector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'C')
+    ) STORED,
+    PRIMARY KEY (knowlid, partnum)
+)
+"""
+
+# power(random(), 3) 让小编号的词出现得多，term0 近似出现在大多数段落中
+FILL = """
+INSERT INTO knowledgeoverviews (knowlid, typeid, knowltitle, versionnum)
+SELECT d, 1 + d % 12, 'Document ' || d || ' term' || floor(power(random(), 3) * :vocab)::int, 1
+FROM generate_series(1, :documents) d;
+INSERT INTO knowledgecontents (knowlid, partnum, title, content)
+SELECT g / :parts_per_doc + 1, g % :parts_per_doc + 1, 'Part ' || g,
+    (SELECT string_agg('term' || floor(power(random(), 3) * :vocab)::int, ' ')
+     FROM generate_series(1, :words + 0 * g))
+FROM generate_series(0, :parts - 1) g;
+CREATE INDEX ON knowledgeoverviews USING GIN (searchvector);
+CREATE INDEX ON knowledgecontents USING GIN (searchvector);
+ANALYZE knowledgeoverviews;
+ANALYZE knowledgecontents
+"""
+
+
+def run(connection, statement):
+    for part in statement.split(";"):
+        if part.strip():
+            connection.execute(text(part))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="SQLAlchemy database URL, defaults to .streamlit/secrets.toml")
+    parser.add_argument("--parts", type=int, default=1_000_000)
+    parser.add_argument("--parts-per-doc", type=int, default=20)
+    parser.add_argument("--words", type=int, default=40, help="words per content part")
+    parser.add_argument("--vocab", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(database_url(args))
+    with engine.connect() as connection:
+        start = time.perf_counter()
+        run(connection, SCHEMA)
+        for statement in FILL.split(";"):
+            if statement.strip():
+                connection.execute(text(statement), {
+                    "vocab": args.vocab, "parts": args.parts, "parts_per_doc": args.parts_per_doc,
+                    "documents": (args.parts + args.parts_per_doc - 1) // args.parts_per_doc, "words": args.words,
+                })
+        print(f"{args.parts:,} parts loaded and indexed in {time.perf_counter() - start:.1f} s")
+
+        terms = ["term0", "term1 term2", "term40", "term900", "term4999"]
+        print(f"{'query':<14}{'matches':>10}{'cap':>8}{'p50 ms':>10}{'p95 ms':>10}{'target':>8}")
+        for term in terms:
+            matches = connection.execute(text(
+                "SELECT COUNT(*) FROM knowledgecontents WHERE searchvector @@ websearch_to_tsquery('english', :q)"
+            ), {"q": term}).scalar_one()
+            for cap in (MAX_CONTENT_MATCHES, args.parts):
+                timings = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    connection.execute(text(SEARCH_QUERY), search_params(term, max_matches=cap)).all()
+                    timings.append((time.perf_counter() - started) * 1000)
+                p50, p95 = np.percentile(timings, [50, 95])
+                label = "none" if cap == args.parts else str(cap)
+                verdict = "ok" if p95 <= TARGET_MS else "over"
+                print(f"{term:<14}{matches:>10,}{label:>8}{p50:>10.1f}{p95:>10.1f}{verdict:>8}")
+
+
+if __name__ == "__main__":
+    main()
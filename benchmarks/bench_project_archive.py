@@ -0,0 +1,128 @@
+"""Compare per-row commits with the single-transaction bulk insert used to archive projects.
+
+Runs against TEMP copies of projectsoverviews/projectscontents so no real data is touched.
+The database URL is read from [connections.postgresql] in .streamlit/secrets.toml unless --url is given.
+Run from the project root: python benchmarks/bench_project_archive.py --steps 500
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import tomllib
+from sqlalchemy import create_engine
+from sqlalchemy.engine import URL
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import text
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from utils.project_archive import archive_project
+
+SCHEMA = """
+CREATE TEMP TABLE projectsoverviews (
+    projid INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    knowlid INTEGER,
+    projtitle VARCHAR,
+    begintime DATE,
+    predictfinishtime DATE,
+    actualfinishtime DATE
+);
+CREATE TEMP TABLE projectscontents (
+    projid INTEGER REFERENCES projectsoverviews(projid),
+    step INTEGER,
+    title VARCHAR,
+    userid INTEGER,
+    begintime DATE,
+    predictfinishtime DATE,
+    actualfinishtime DATE,
+    completionrate DECIMAL(5,2),
+    remark VARCHAR,
+    PRIMARY KEY (projid, step)
+);
+"""
+
+
+def database_url(args):
+    if args.url:
+        return args.url
+    with open(os.path.join(ROOT, ".streamlit", "secrets.toml"), "rb") as f:
+        settings = tomllib.load(f)["connections"]["postgresql"]
+    return URL.create(
+        settings.get("dialect", "postgresql"),
+        username=settings.get("username"),
+        password=settings.get("password"),
+        host=settings.get("host"),
+        port=settings.get("port"),
+        database=settings.get("database"),
+    )
+
+
+def overview():
+    today = date.today()
+    return {"knowlid": None, "projtitle": "bench project",
+            "begintime": today, "predictfinishtime": today, "actualfinishtime": today}
+
+
+def content_rows(steps):
+    today = date.today()
+    return [{
+        "step": step, "title": f"Step {step}", "userid": None,
+        "begintime": today, "predictfinishtime": None, "actualfinishtime": None,
+        "completionrate": 0.0, "remark": "benchmark row " * 4,
+    } for step in range(1, steps + 1)]
+
+
+def archive_per_row(session, steps):
+    """The old path: MAX(projid) + 1, then one statement and one commit per step"""
+    projid = session.execute(text("SELECT COALESCE(MAX(projid), 0) + 1 FROM projectsoverviews")).scalar_one()
+    session.execute(text("""
+        INSERT INTO projectsoverviews(projid, knowlid, projtitle, begintime, predictfinishtime, actualfinishtime)
+        VALUES (:projid, :knowlid, :projtitle, :begintime, :predictfinishtime, :actualfinishtime)
+    """), {**overview(), "projid": projid})
+    session.commit()
+    for row in content_rows(steps):
+        row["projid"] = projid
+        session.execute(text("""
+            INSERT INTO projectscontents
+            VALUES (:projid, :step, :title, :userid, :begintime, :predictfinishtime,
+                    :actualfinishtime, :completionrate, :remark)
+        """), row)
+        session.commit()
+
+
+def archive_bulk(session, steps):
+    """The Projects page path: identity projid via RETURNING, one multi-row insert, one commit"""
+    archive_project(session, overview(), content_rows(steps))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="SQLAlchemy database URL, defaults to .streamlit/secrets.toml")
+    parser.add_argument("--steps", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(database_url(args))
+    with Session(engine) as session:
+        for statement in SCHEMA.split(";"):
+            if statement.strip():
+                session.execute(text(statement))
+        session.commit()
+
+        print(f"{args.steps} steps per project, {args.repeat} projects per method")
+        print(f"{'method':<10}{'mean ms':>10}{'best ms':>10}")
+        # bulk runs first: the old MAX(projid) + 1 path then continues after the identity-allocated ids
+        for name, archive in (("bulk", archive_bulk), ("per-row", archive_per_row)):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                archive(session, args.steps)
+                timings.append((time.perf_counter() - start) * 1000)
+            print(f"{name:<10}{sum(timings) / len(timings):>10.1f}{min(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,56 +2,143 @@ import streamlit as st
 from datetime import datetime
 import pandas as pd
 from sqlalchemy.sql import text
-conn = st.connection("postgresql", type="sql")
+from utils.db import get_connection
+conn = get_connection()
 
 from streamlit_chat import message
-import tempfile   # temporary file
-from langchain.document_loaders.csv_loader import CSVLoader  # using CSV loaders
-from langchain.embeddings import HuggingFaceEmbeddings # import hf embedding
-from langchain.vectorstores import FAISS
+import io
+import time
 from llama_cpp import Llama
 from langchain.chains import ConversationalRetrievalChain
-from langchain_community.llms import LlamaCpp
 from langchain_core.runnables import Runnable
+from utils.vector_store import content_hash, load_or_build_index
+from utils.model_registry import get_llm, get_embeddings, get_load_times, generation_lock
+from utils.knowledge_indexer import start_indexer, get_index, get_index_status
+from utils.llm_streaming import TokenStreamHandler
+from utils.hybrid_retriever import get_hybrid_retriever
+from utils.chat_history import ChatHistory, count_tokens
+from utils.answer_cache import get_answer_cache
+from utils.inference_queue import get_inference_queue, QueueFullError
+from utils.ingestion import iter_file_documents, ingest
+from utils.knowledge_search import SEARCH_PAGE_SIZE, SEARCH_QUERY, search_params
 
-def show():
-    def get_knowledge_overviews(type_id=None, search_query=None):
-        query = f"""
-            SELECT knowlid, typeid, knowltitle, versionnum 
-            FROM knowledgeoverviews 
-            WHERE typeid = 5
-            ORDER BY knowlid asc
-            """
-        if type_id:
-            query = f"""
-            SELECT knowlid, typeid, knowltitle, versionnum 
-            FROM knowledgeoverviews 
-            WHERE typeid = '{type_id}'
-            ORDER BY knowlid asc
-            """
-        if search_query:
-            query = f"""
-            SELECT knowlid, typeid, knowltitle, versionnum 
-            FROM knowledgeoverviews 
-            WHERE knowltitle ILIKE '%{search_query}%'
-            ORDER BY knowlid asc
-            """
-        results = conn.query(query, ttl=3600)
-        return results
-
-    def get_knowledge_contents(knowlid):
-        query = f"""
-        SELECT partnum, title, content 
-        FROM knowledgecontents
-        WHERE knowlid = '{knowlid}'
+CATEGORY_PAGE_SIZE = 25
+CATEGORIES = {
+    ":twisted_rightwards_arrows: Process": 11,
+    ":office: Policy": 7,
+    "🛠️ Technical Specification": 9,
+    ":soon: Operation Guide": 5,
+    ":mag: Search": None,
+}
+
+def get_knowledge_overviews(type_id=None, page=0, page_size=CATEGORY_PAGE_SIZE):
+    query = """
+        SELECT knowlid, typeid, knowltitle, versionnum, COUNT(*) OVER () AS total
+        FROM knowledgeoverviews 
+        WHERE typeid = :type_id
         ORDER BY knowlid asc
+        LIMIT :limit OFFSET :offset
         """
-        results = conn.query(query, ttl=3600)
-        return results
-    
-    def show_knowl(type_id=None, search_query=None):
-        knowledge_data = get_knowledge_overviews(type_id, search_query)
+    params = {"type_id": type_id or 5, "limit": page_size, "offset": page * page_size}
+    results = conn.query(query, params=params, ttl=3600)
+    return results
+
+def get_knowledge_contents(knowlids):
+    # 一次查询取回所有文档的内容，避免每个文档单独查询
+    if not knowlids:
+        return pd.DataFrame(columns=["knowlid", "partnum", "title", "content"])
+    query = """
+    SELECT knowlid, partnum, title, content 
+    FROM knowledgecontents
+    WHERE knowlid = ANY(:knowlids)
+    ORDER BY knowlid asc, partnum asc
+    """
+    results = conn.query(query, params={"knowlids": [int(k) for k in knowlids]}, ttl=3600)
+    return results
+
+def group_contents(contents):
+    return {
+        knowlid: group.drop(columns="knowlid").reset_index(drop=True)
+        for knowlid, group in contents.groupby("knowlid")
+    }
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def load_knowledge(type_id=None, page=0):
+    """One page of a category's overviews plus their contents grouped by knowlid"""
+    overviews = get_knowledge_overviews(type_id, page)
+    contents = get_knowledge_contents(overviews['knowlid'].tolist())
+    return overviews, group_contents(contents)
+
+def search_knowledge(search_query, page=0):
+    """Ranked full-text search over titles and contents, one row per document with a highlighted snippet"""
+    return conn.query(SEARCH_QUERY, params=search_params(search_query, page), ttl=600)
+
+def show_pager(key, page, page_count):
+    col_prev, _, col_next = st.columns([1, 4, 1])
+    with col_prev:
+        if st.button("⬅️ Previous", disabled=page == 0, key=f"{key}_prev"):
+            st.session_state[key] = page - 1
+            st.rerun()
+    with col_next:
+        if st.button("Next ➡️", disabled=page + 1 >= page_count, key=f"{key}_next"):
+            st.session_state[key] = page + 1
+            st.rerun()
+
+def answer_question(job, chain, llm, embeddings, history, query, index_version):
+    """Runs on an inference worker thread; streams the answer into job.text"""
+    standalone = not history
+    handler = TokenStreamHandler(on_token=job.set_text, skip_generations=1 if history else 0)
+    with generation_lock:
+        # 超出 token 预算时先把旧对话并入摘要再生成，避免超出 n_ctx；放在生成之前，答案返回后不再额外阻塞
+        history.compact(llm)
+        result = chain({"question": query, "chat_history": history.for_chain()}, callbacks=[handler]) 
+        history.add_turn(query, result["answer"])
+    # 只缓存不依赖上下文的首轮问答，追问的答案离开对话历史没有意义
+    if standalone:
+        get_answer_cache().store(embeddings, query, result["answer"], index_version)
+    metrics = handler.metrics()
+    metrics["prompt_tokens"] = [count_tokens(llm, prompt) for prompt in handler.prompts]
+    metrics["queue_wait"] = job.wait_time
+    return result["answer"], metrics
+
+@st.fragment(run_every=0.5)
+def show_pending_answer(pending):
+    inference_queue = get_inference_queue()
+    job = inference_queue.get(pending["id"])
+    if job is None or job.finished:
+        if job is not None and job.status == "done":
+            answer, metrics = job.result
+            st.session_state['past'].append(pending["query"])
+            st.session_state['generated'].append(answer)
+            st.session_state['answer_metrics'].append(metrics)
+        else:
+            st.session_state['inference_error'] = job.error if job is not None else "The request expired"
+        del st.session_state['pending_job']
+        st.rerun()
+
+    if job.status == "queued":
+        st.info(f"Job {job.id[:8]} is waiting in the queue (position {inference_queue.position(job.id)}, {job.wait_time:.0f}s so far)")
+    elif job.text:
+        st.markdown(job.text + "▌")
+    else:
+        st.caption(f"Job {job.id[:8]} is generating...")
+
+def show():
+    def show_knowl(type_id=None):
+        page_key = f"knowl_page_{type_id}"
+        page = st.session_state.get(page_key, 0)
+        knowledge_data, contents_by_id = load_knowledge(type_id, page)
+        if knowledge_data.empty and page > 0:
+            st.session_state[page_key] = 0
+            st.rerun()
+        if knowledge_data.empty:
+            st.info("No documents in this category yet.")
+            return
+        total = int(knowledge_data['total'].iloc[0])
+        page_count = (total + CATEGORY_PAGE_SIZE - 1) // CATEGORY_PAGE_SIZE
+        st.caption(f"{total} documents, page {page + 1} of {page_count}")
         knowledge_data = knowledge_data[['knowlid', 'versionnum', 'knowltitle']]
+        empty_contents = pd.DataFrame(columns=["partnum", "title", "content"])
         
         
         # Iterate over rows using iterrows()
@@ -67,92 +154,169 @@ def show():
                         "knowltitle": st.column_config.TextColumn(width="large")
                     }
                 )
-                knowledge_data_detail = get_knowledge_contents(row['knowlid'])
+                knowledge_data_detail = contents_by_id.get(row['knowlid'], empty_contents)
                 st.dataframe(knowledge_data_detail,use_container_width=True)
 
-    
+        show_pager(page_key, page, page_count)
+
+    def show_search(search_query):
+        search_query = search_query.strip()
+        if not search_query:
+            st.info("Enter keywords to search titles and contents of all documents.")
+            return
+        if st.session_state.get('knowl_search_query') != search_query:
+            st.session_state['knowl_search_query'] = search_query
+            st.session_state['knowl_search_page'] = 0
+        page = st.session_state.get('knowl_search_page', 0)
+
+        results = search_knowledge(search_query, page)
+        if results.empty:
+            st.warning("No documents match your search.")
+            return
+        total = int(results['total'].iloc[0])
+        page_count = (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+        total_label = f"{total}+" if bool(results['capped'].iloc[0]) else str(total)
+        st.caption(f"{total_label} matching documents, page {page + 1} of {page_count}")
+
+        contents_by_id = group_contents(get_knowledge_contents(results['knowlid'].tolist()))
+        empty_contents = pd.DataFrame(columns=["partnum", "title", "content"])
+        for _, row in results.iterrows():
+            with st.expander(f" :pushpin: {row['knowltitle']}"):
+                st.markdown(row['snippet'])
+                st.dataframe(contents_by_id.get(row['knowlid'], empty_contents), use_container_width=True)
+
+        show_pager('knowl_search_page', page, page_count)
+
     # Create two main sections
     upper_section = st.container()
     lower_section = st.container()
     
     with upper_section:
         st.header(":books: Knowledge Documents")
-        st.markdown("""
-        <style>
-            .stTabs [data-baseweb="tab-list"] {
-                gap: 0px;
-            }
-            .stTabs [data-baseweb="tab"] {
-                flex: 1;
-                text-align: center;
-                padding: 10px 5px;
-                font-size: 14px;
-            }
-        </style>
-        """, unsafe_allow_html=True)
-
-        tabs = st.tabs([":twisted_rightwards_arrows: Process",
-        ":office: Policy", 
-        "🛠️ Technical Specification",
-        ":soon: Operation Guide  ", 
-        ":mag: Search"])
-        with tabs[0]:
-            show_knowl(type_id=11)
-        with tabs[1]:
-            show_knowl(type_id=7)
-        with tabs[2]:
-            show_knowl(type_id=9)
-        with tabs[3]:
-            show_knowl(type_id=5)
-        with tabs[4]:
+
+        # st.tabs 会执行所有标签页的内容，这里只渲染并查询当前选中的分类
+        category = st.radio(
+            "Category",
+            options=list(CATEGORIES.keys()),
+            horizontal=True,
+            label_visibility="collapsed",
+            key="knowl_category"
+        )
+        if CATEGORIES[category] is None:
             search_query = st.text_input("Search documents:", placeholder="Enter keywords to search...")
-            show_knowl(search_query=search_query)
+            show_search(search_query)
+        else:
+            show_knowl(type_id=CATEGORIES[category])
 
 
     
     with lower_section:
         
-        DB_FAISS_PATH = 'vectorstore/db_faiss' # # Set the path of our generated embeddings
-        model_path = "./models/TheBloke/llama-2-7b-chat.Q4_K_M.gguf"
-
-        llm = LlamaCpp(
-        model_path=model_path,
-        n_ctx=2048,  # Context window
-        n_batch=512,  # Batch size
-        temperature=0.7,
-        top_p=1,
-        verbose=True,
-        )
-
         st.header(":rainbow: AI Assistant")
-        uploaded_file = st.file_uploader("Upload File", type="csv") # uploaded file is stored here
-        # file uploader
-        if uploaded_file:
-            with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                tmp_file_path = tmp_file.name # save file locally
-
-            loader = CSVLoader(file_path=tmp_file_path, encoding="utf-8", csv_args={'delimiter': ','}) 
-            data = loader.load()
-            embeddings = HuggingFaceEmbeddings(model_name='sentence-transformers/all-MiniLM-L6-v2',model_kwargs={'device': 'cpu'}) 
-
-            db = FAISS.from_documents(data, embeddings) 
-            db.save_local(DB_FAISS_PATH)
-           
-            chain = ConversationalRetrievalChain.from_llm(llm=llm, retriever=db.as_retriever())
+        source = st.radio("Answer from", ["Knowledge Base", "Uploaded CSV"], horizontal=True, key="assistant_source")
+        db = None
+        source_name = None
+
+        if source == "Knowledge Base":
+            # 后台线程按 versionnum 增量同步 knowledgecontents 到 vectorstore/db_faiss
+            start_indexer(conn.engine)
+            db = get_index()
+            index_status = get_index_status()
+            source_name = "the knowledge base"
+            index_version = f"kb-{index_status['index_version']}"
+            if db is None:
+                if index_status["last_error"]:
+                    st.error(f"Knowledge base indexing failed: {index_status['last_error']}")
+                else:
+                    st.info("The knowledge base index is being built, please try again shortly.")
+            else:
+                st.caption(f"Indexed {index_status['documents']} documents / {index_status['chunks']} chunks (version {index_status['index_version']})")
+        else:
+            uploaded_file = st.file_uploader("Upload File", type=["csv", "pdf"]) # uploaded file is stored here
+            # file uploader
+            if uploaded_file:
+                file_bytes = uploaded_file.getvalue()
+                source_name = uploaded_file.name
+                with st.spinner("Loading models..."):
+                    embeddings = get_embeddings()
+
+                def build_index():
+                    # 流式读取 -> 分块 -> 批量 embedding -> 追加到索引，大文件内存占用有上限
+                    progress_bar = st.progress(0.0, text="Reading " + uploaded_file.name)
+                    read_fraction = [0.0]
+
+                    def on_read(fraction):
+                        read_fraction[0] = min(fraction, 1.0)
+
+                    def on_embedded(stats):
+                        progress_bar.progress(read_fraction[0], text=f"Embedded {stats['chunks']:,} chunks")
+
+                    documents = iter_file_documents(io.BytesIO(file_bytes), uploaded_file.name, progress=on_read)
+                    db = ingest(documents, embeddings, progress=on_embedded)
+                    progress_bar.empty()
+                    if db is None:
+                        raise ValueError("No text could be extracted from " + uploaded_file.name)
+                    return db
+
+                # 每次提问都会重跑脚本，内容哈希按 file_id 缓存，只在上传新文件时计算
+                cached_key = st.session_state.get('upload_content_key')
+                if cached_key is None or cached_key[0] != uploaded_file.file_id:
+                    cached_key = (uploaded_file.file_id, content_hash(file_bytes))
+                    st.session_state['upload_content_key'] = cached_key
+
+                # 相同内容的文件直接复用已保存的索引，只有新内容才重新 embedding
+                try:
+                    db, index_key, built = load_or_build_index(file_bytes, build_index, embeddings, key=cached_key[1])
+                except ValueError as e:
+                    st.error(str(e))
+                    index_key = None
+                index_version = f"upload-{index_key}"
+
+        if db is not None:
+            with st.spinner("Loading models..."):
+                embeddings = get_embeddings()
+                llm = get_llm()
+            answer_cache = get_answer_cache()
+            # BM25 关键词检索与向量检索融合，错误码、零件号等精确词也能召回
+            chain = ConversationalRetrievalChain.from_llm(llm=llm, retriever=get_hybrid_retriever(db))
            
             def conversational_chat(query):
-               
-                result = chain({"question": query, "chat_history": st.session_state['history']}) 
-                st.session_state['history'].append((query, result["answer"]))
-                return result["answer"] 
+                history = st.session_state['history']
+                start = time.perf_counter()
+                # 和写入缓存的条件一致：只有首轮问题才查缓存，追问依赖对话上下文
+                cached = answer_cache.lookup(embeddings, query, index_version) if not history else None
+                if cached:
+                    # 常见问题直接返回缓存答案，省去一次完整的 LLM 生成
+                    history.add_turn(query, cached["answer"])
+                    st.session_state['answer_metrics'].append({
+                        "cache_hit": True,
+                        "similarity": cached["similarity"],
+                        "total_time": time.perf_counter() - start,
+                    })
+                    return cached["answer"]
+
+                # LLM 生成交给后台线程池，页面通过轮询显示进度，不阻塞脚本线程
+                try:
+                    job = get_inference_queue().submit(answer_question, chain, llm, embeddings, history, query, index_version)
+                except QueueFullError as e:
+                    st.warning(str(e))
+                    return None
+                st.session_state['pending_job'] = {"id": job.id, "query": query}
+                return None
 
-            if 'history' not in st.session_state:
-                st.session_state['history'] = []
+            if not isinstance(st.session_state.get('history'), ChatHistory):
+                st.session_state['history'] = ChatHistory()
             if 'generated' not in st.session_state:
-                st.session_state['generated'] = ["Hello ! Ask me(LLAMA2) about " + uploaded_file.name + " 🤗"]
+                st.session_state['generated'] = ["Hello ! Ask me(LLAMA2) about " + source_name + " 🤗"]
             if 'past' not in st.session_state:
                 st.session_state['past'] = ["Hey ! 👋"]
+            if 'answer_metrics' not in st.session_state:
+                st.session_state['answer_metrics'] = []
+            pending = st.session_state.get('pending_job')
+
+            load_times = get_load_times()
+            if load_times:
+                st.caption("Model load time: " + ", ".join(f"{name} {seconds:.1f}s" for name, seconds in load_times.items()))
 
             response_container = st.container() 
             container = st.container()
@@ -160,17 +324,38 @@ def show():
             with container:
                 with st.form(key='my_form', clear_on_submit=True):
                     user_input = st.text_input("Query:", placeholder="Talk to data 👉 (:", key='input') # user input values are here
-                    submit_button = st.form_submit_button(label='Send') # button to retrieve answer
+                    submit_button = st.form_submit_button(label='Send', disabled=pending is not None) # button to retrieve answer
 
-                if submit_button and user_input:
+                if submit_button and user_input and pending is None:
                     output = conversational_chat(user_input)
+                    if output is not None:
+                        st.session_state['past'].append(user_input) 
+                        st.session_state['generated'].append(output) 
+                    else:
+                        pending = st.session_state.get('pending_job')
 
-                    st.session_state['past'].append(user_input) 
-                    st.session_state['generated'].append(output) 
+                if pending:
+                    show_pending_answer(pending)
 
             if st.session_state['generated']:
                 with response_container:
                     for i in range(len(st.session_state['generated'])):
                         message(st.session_state["past"][i], is_user=True, key=str(i) + '_user', avatar_style="big-smile")
                         message(st.session_state["generated"][i], key=str(i), avatar_style="thumbs")
+
+            if st.session_state['answer_metrics']:
+                last_metrics = st.session_state['answer_metrics'][-1]
+                if last_metrics.get("cache_hit"):
+                    st.caption(f"Last answer: served from cache in {last_metrics['total_time'] * 1000:.0f} ms (similarity {last_metrics['similarity']:.2f})")
+                elif last_metrics["time_to_first_token"] is not None:
+                    speed = f"{last_metrics['tokens_per_sec']:.1f} tokens/s" if last_metrics["tokens_per_sec"] else "n/a"
+                    st.caption(f"Last answer: first token after {last_metrics['time_to_first_token']:.1f}s, {last_metrics['tokens']} tokens at {speed}, "
+                               f"prompt tokens {' + '.join(str(n) for n in last_metrics.get('prompt_tokens', []))}")
+
+            if st.session_state.get('inference_error'):
+                st.error(f"Failed to answer: {st.session_state.pop('inference_error')}")
+
+            queue_stats = get_inference_queue().stats()
+            st.caption(f"Inference queue: {queue_stats['queued']} waiting, {queue_stats['running']} running, "
+                       f"wait avg {queue_stats['avg_wait']:.1f}s / p95 {queue_stats['p95_wait']:.1f}s")
                 
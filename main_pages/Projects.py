@@ -1,8 +1,9 @@
 import streamlit as st
 from datetime import datetime
 import pandas as pd
-from sqlalchemy.sql import text
-conn = st.connection("postgresql", type="sql")
+from utils.db import get_connection
+from utils.project_archive import archive_project
+conn = get_connection()
 
 def get_processes():
     query = """
@@ -24,16 +25,83 @@ def get_users():
     result = conn.query(query, ttl=3600)
     return result['username'].tolist()
 
+def get_user_ids():
+    query = """
+    SELECT username, userid 
+    FROM users 
+    WHERE typeid = 2
+    """
+    result = conn.query(query, ttl=3600)
+    return dict(zip(result['username'], result['userid']))
+
 def get_knowlcontents(knowl_id):
-    query = f"""
+    query = """
     SELECT partnum, title, content 
     FROM knowledgecontents 
-    WHERE knowlid = '{knowl_id}'
+    WHERE knowlid = :knowlid
     ORDER BY partnum ASC
     """
-    results = conn.query(query, ttl=3600)
+    results = conn.query(query, params={"knowlid": int(knowl_id)}, ttl=3600)
     return results
 
+def build_project_df(project):
+    if not project.get('knowlid'):
+        return pd.DataFrame([{
+            "step": 0,
+            "step_title": "",
+            "responsible_staff": "",
+            "begin_time": pd.to_datetime("today").date(),
+            "predict_finish_time": None,
+            "actual_finish_time": None,
+            "completion_rate": 0.0,
+            "remark": ""
+        }])
+    knowl_contents = get_knowlcontents(project['knowlid'])
+    data = [{
+        "step": row['partnum'],
+        "step_title": row['title'],
+        "responsible_staff": "",
+        "begin_time": pd.to_datetime("today").date(),
+        "predict_finish_time": None,
+        "actual_finish_time": None,
+        "completion_rate": 0.0,
+        "remark": row['content']
+    } for _, row in knowl_contents.iterrows()]
+    return pd.DataFrame(data)
+
+def apply_editor_state(project_df, project_state):
+    """Replay st.data_editor deletions, edits and added rows onto the base dataframe"""
+    if project_state.get('deleted_rows'):
+        project_df = project_df.drop(project_state['deleted_rows']).reset_index(drop=True)
+
+    if project_state.get('edited_rows'):
+        for row_index, changes in project_state['edited_rows'].items():
+            row_index = int(row_index)
+            for column_name, new_value in changes.items():
+                project_df.at[row_index, column_name] = new_value
+
+    added_rows = [row for row in project_state.get('added_rows', []) if row]
+    if added_rows:
+        new_rows = pd.DataFrame([{col: row.get(col) for col in project_df.columns} for row in added_rows])
+        project_df = pd.concat([project_df, new_rows], ignore_index=True)
+    return project_df
+
+def _value(value):
+    return None if value is None or pd.isna(value) else value
+
+def project_content_rows(project_df, user_ids):
+    return [{
+        "step": int(row['step']) if _value(row['step']) is not None else None,
+        "title": _value(row['step_title']),
+        "userid": user_ids.get(row['responsible_staff']),
+        "begintime": _value(row['begin_time']),
+        "predictfinishtime": _value(row['predict_finish_time']),
+        "actualfinishtime": _value(row['actual_finish_time']),
+        "completionrate": _value(row['completion_rate']),
+        "remark": _value(row['remark']),
+    } for _, row in project_df.iterrows()]
+
+
 def show(): 
     if 'projects' not in st.session_state:
         st.session_state.projects = []
@@ -60,30 +128,7 @@ def show():
         user_options = get_users() 
         for i, project in enumerate(st.session_state.projects):
             with st.expander(f"{project['projectname']}", expanded=True):
-                if not project.get('knowlid'):
-                    project_df = pd.DataFrame([{
-                        "step": 0,
-                        "step_title": "",
-                        "responsible_staff": "",
-                        "begin_time": pd.to_datetime("today").date(),
-                        "predict_finish_time": None,
-                        "actual_finish_time": None,
-                        "completion_rate": 0.0,
-                        "remark": ""
-                    }])
-                else:
-                    knowl_contents = get_knowlcontents(project['knowlid'])
-                    data = [{
-                        "step": row['partnum'],
-                        "step_title": row['title'],
-                        "responsible_staff": "",
-                        "begin_time": pd.to_datetime("today").date(),
-                        "predict_finish_time": None,
-                        "actual_finish_time": None,
-                        "completion_rate": 0.0,
-                        "remark": row['content']
-                    } for _, row in knowl_contents.iterrows()]
-                    project_df = pd.DataFrame(data)
+                project_df = build_project_df(project)
 
                 edited_df = st.data_editor(
                     project_df,
@@ -153,79 +198,23 @@ def show():
             submitted = st.form_submit_button("Archive")
 
         if submitted:
-            max_id = conn.query("SELECT COALESCE(MAX(projid), 0) FROM projectsoverviews").iat[0, 0]
-            new_project_id = max_id + 1
-            project = next(p for p in st.session_state.projects if p['projectname'] == project_search)
+            project_index = next(i for i, p in enumerate(st.session_state.projects) if p['projectname'] == project_search)
+            project = st.session_state.projects[project_index]
+            project_state = st.session_state.get(f"project_editor_{project_index}", {})
+            project_df = apply_editor_state(build_project_df(project), project_state)
+
+            overview = {
+                "knowlid": project.get('knowlid') or None,
+                "projtitle": project_search,
+                "begintime": project.get('begintime'),
+                "predictfinishtime": project.get('predictfinishtime') or datetime.now().date(),
+                "actualfinishtime": end_date,
+            }
+            content_rows = project_content_rows(project_df, get_user_ids())
             with conn.session as s:
-                knowlid_archive = project.get('knowlid')
-                if not st.write(project.get('knowlid')):
-                    knowlid_archive = 0
-                overview_query = f"""
-                    INSERT INTO projectsoverviews(projid,knowlid,projtitle,begintime,predictfinishtime,actualfinishtime)
-                    VALUES ({new_project_id}, {knowlid_archive}, '{project_search}', 
-                            '{project.get('begintime')}','{project.get('predictfinishtime', datetime.now().date())}',
-                            '{end_date}')
-                    """
-                
-                s.execute(text(overview_query))
-                s.commit()
-
-                project_index = next(i for i, p in enumerate(st.session_state.projects) if p['projectname'] == project_search)
-                project_state = st.session_state[f"project_editor_{project_index}"]
-                if project.get('knowlid'):
-                    knowl_contents = get_knowlcontents(project['knowlid'])
-                    data = [{
-                        "step": row['partnum'],
-                        "step_title": row['title'],
-                        "responsible_staff": "",
-                        "begin_time": pd.to_datetime("today").date(),
-                        "predict_finish_time": None,
-                        "actual_finish_time": None,
-                        "completion_rate": 0.0,
-                        "remark": row['content']
-                    } for _, row in knowl_contents.iterrows()]
-                    project_df = pd.DataFrame(data)
- 
-                if project_state['deleted_rows']:
-                    deletions = project_state['deleted_rows']
-                    project_df = project_df.drop(deletions).reset_index(drop=True)
-
-                if project_state['edited_rows']:
-                    for row_index, changes in project_state['edited_rows'].items():
-                        row_index = int(row_index)
-                        for column, new_value in changes.items():
-                            project_df.at[row_index, column] = new_value
-
-                if 'added_rows' in project_state and project_state['added_rows']:
-                    for added_row in project_state['added_rows']:
-
-                        if added_row:
-
-                            new_row_data = {}
-                            for col in project_df.columns:
-                                new_row_data[col] = added_row.get(col, None) 
-                            
-                            project_df = pd.concat([project_df, pd.DataFrame([new_row_data])], ignore_index=True)
-                project_df.insert(0, 'projectid', new_project_id)
-
-                for _, row in project_df.iterrows():
-                    content_query = f"""
-                    INSERT INTO projectscontents 
-                    VALUES (
-                        {row['projectid']}, {row['step']}, '{row['step_title']}', 
-                        '{row['responsible_staff']}', '{row['begin_time']}', 
-                        {f"'{row['predict_finish_time']}'" if pd.notna(row['predict_finish_time']) else 'NULL'}, 
-                        {f"'{row['actual_finish_time']}'" if pd.notna(row['actual_finish_time']) else 'NULL'}, 
-                        {row['completion_rate']}, '{row['remark']}'
-                    )
-                    """
-                    s.execute(text(content_query))
-                    s.commit()
-            
-
+                archive_project(s, overview, content_rows)
 
-            
-            st.session_state.projects.pop(i)
+            st.session_state.projects.pop(project_index)
             st.success("Project archived successfully!")
             st.cache_data.clear()
             st.session_state.archive_form = False
@@ -0,0 +1,18 @@
+-- Add full-text search to an existing operation_support_system database.
+-- New installs get the same columns and indexes from set_database.txt.
+ALTER TABLE knowledgeoverviews
+    ADD COLUMN IF NOT EXISTS searchvector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(knowltitle, '')), 'A')
+    ) STORED;
+
+ALTER TABLE knowledgecontents
+    ADD COLUMN IF NOT EXISTS searchvector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS knowledgeoverviews_search_idx ON knowledgeoverviews USING GIN (searchvector);
+CREATE INDEX IF NOT EXISTS knowledgecontents_search_idx ON knowledgecontents USING GIN (searchvector);
+
+ANALYZE knowledgeoverviews;
+ANALYZE knowledgecontents;
@@ -0,0 +1,21 @@
+-- Let PostgreSQL allocate ids instead of the application computing MAX(id) + 1.
+-- New installs get the same identity columns from set_database.txt.
+-- BY DEFAULT keeps explicit ids (seed data, Admin edits) working; each sequence
+-- is moved past the current maximum so new rows never collide with old ones.
+BEGIN;
+
+ALTER TABLE organizationdepartment ALTER COLUMN orgdeptid ADD GENERATED BY DEFAULT AS IDENTITY;
+ALTER TABLE types ALTER COLUMN typeid ADD GENERATED BY DEFAULT AS IDENTITY;
+ALTER TABLE users ALTER COLUMN userid ADD GENERATED BY DEFAULT AS IDENTITY;
+ALTER TABLE knowledgeoverviews ALTER COLUMN knowlid ADD GENERATED BY DEFAULT AS IDENTITY;
+ALTER TABLE projectsoverviews ALTER COLUMN projid ADD GENERATED BY DEFAULT AS IDENTITY;
+ALTER TABLE problemsoverview ALTER COLUMN probid ADD GENERATED BY DEFAULT AS IDENTITY;
+
+SELECT setval(pg_get_serial_sequence('organizationdepartment', 'orgdeptid'), COALESCE(MAX(orgdeptid), 0) + 1, false) FROM organizationdepartment;
+SELECT setval(pg_get_serial_sequence('types', 'typeid'), COALESCE(MAX(typeid), 0) + 1, false) FROM types;
+SELECT setval(pg_get_serial_sequence('users', 'userid'), COALESCE(MAX(userid), 0) + 1, false) FROM users;
+SELECT setval(pg_get_serial_sequence('knowledgeoverviews', 'knowlid'), COALESCE(MAX(knowlid), 0) + 1, false) FROM knowledgeoverviews;
+SELECT setval(pg_get_serial_sequence('projectsoverviews', 'projid'), COALESCE(MAX(projid), 0) + 1, false) FROM projectsoverviews;
+SELECT setval(pg_get_serial_sequence('problemsoverview', 'probid'), COALESCE(MAX(probid), 0) + 1, false) FROM problemsoverview;
+
+COMMIT;
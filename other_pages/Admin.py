@@ -3,23 +3,35 @@ import pandas as pd
 from sqlalchemy.sql import text
 from datetime import datetime
 from utils.session_state import get_session_state, set_session_state
+from utils.db import extend_statement_timeout, get_connection, pool_stats, quote_ident
+from utils.bulk_import import CONFLICT_MODES, bulk_load, iter_upload_chunks, validate_columns
+from utils.config import get_config
+from utils import query_stats
 import os
 
+PAGE_SIZES = [25, 50, 100, 500, 1000]
+PICKER_LIMIT = 50
+INTEGER_TYPES = ['integer', 'bigint', 'smallint']
+DECIMAL_TYPES = ['numeric', 'double precision', 'real']
+TEXT_TYPES = ['character varying', 'text', 'character']
+EXACT_COUNT_THRESHOLD = get_config("admin", "exact_count_threshold", 100000)
+
 def show():
     st.title("🛠️ Database Admin Panel")
     st.caption("Manage OSS database with full CRUD operations")
     try:
-        conn = st.connection("postgresql", type="sql")
+        conn = get_connection()
         st.success("✅ Successfully connected to PostgreSQL database")
     except Exception as e:
         st.error(f"❌ Database connection failed: {e}")
         return
-    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
         "📊 Database Overview", 
         "➕ Add Records", 
         "✏️ Edit Records", 
         "🗑️ Delete Records", 
-        "⚙️ Database Tools"
+        "⚙️ Database Tools",
+        "⏱️ Performance"
     ])
     
     with tab1:
@@ -37,70 +49,223 @@ def show():
     with tab5:
         show_database_tools(conn)
 
-def get_table_names(conn):
-    try:
-        query = text("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public'
-            ORDER BY table_name;
-        """)
-        result = conn.session.execute(query)
-        tables = [row[0] for row in result.fetchall()]
-        return tables
-    except Exception as e:
-        st.error(f"Error fetching tables: {e}")
-        return []
+    with tab6:
+        show_performance()
 
-def get_table_data(conn, table_name):
+CATALOG_QUERY = text("""
+    SELECT
+        c.relname,
+        a.attname,
+        format_type(a.atttypid, NULL),
+        a.attnotnull,
+        CASE WHEN a.attgenerated = '' THEN pg_get_expr(d.adbin, d.adrelid) END,
+        a.attgenerated <> '',
+        a.attidentity <> '',
+        array_position(pk.indkey::int2[], a.attnum),
+        fk.confrelid::regclass::text,
+        fa.attname,
+        c.reltuples::bigint
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = 'public'
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    LEFT JOIN pg_attrdef d ON d.adrelid = c.oid AND d.adnum = a.attnum
+    LEFT JOIN pg_index pk ON pk.indrelid = c.oid AND pk.indisprimary
+    LEFT JOIN pg_constraint fk ON fk.conrelid = c.oid AND fk.contype = 'f' AND a.attnum = ANY(fk.conkey)
+    LEFT JOIN pg_attribute fa ON fa.attrelid = fk.confrelid
+        AND fa.attnum = fk.confkey[array_position(fk.conkey, a.attnum)]
+    WHERE c.relkind IN ('r', 'p', 'v', 'f')
+    ORDER BY c.relname, a.attnum;
+""")
+
+@st.cache_data(ttl=get_config("admin", "catalog_ttl", 600), show_spinner=False)
+def load_catalog(_conn):
+    """Tables, columns, primary keys, foreign keys and row estimates of the public schema in one query"""
+    catalog = {}
+    for (table_name, column_name, data_type, not_null, default, generated, identity,
+         pk_position, ref_table, ref_column, estimate) in _conn.session.execute(CATALOG_QUERY):
+        table = catalog.setdefault(table_name, {"columns": {}, "primary_keys": {}, "estimate": estimate})
+        column = table["columns"].get(column_name)
+        if column is None:
+            column = table["columns"][column_name] = {
+                "Column Name": column_name,
+                "Data Type": data_type,
+                "Nullable": "NO" if not_null else "YES",
+                "Default": default if default else "None",
+                "Generated": generated,
+                "Identity": identity,
+                "References": None
+            }
+        if pk_position:
+            table["primary_keys"][pk_position] = column_name
+        if ref_table:
+            # 一列可能有多个外键，逐个列出
+            reference = f"{ref_table}({ref_column})"
+            column["References"] = reference if not column["References"] else f"{column['References']}, {reference}"
+    return {
+        name: {
+            "columns": list(table["columns"].values()),
+            "primary_keys": [table["primary_keys"][i] for i in sorted(table["primary_keys"])],
+            "estimate": table["estimate"]
+        }
+        for name, table in catalog.items()
+    }
+
+def get_catalog(conn):
     try:
-        query = f"""SELECT * FROM {table_name} LIMIT 1000"""
-        df = conn.query(query)
-        return df
+        return load_catalog(conn)
     except Exception as e:
-        st.error(f"Error fetching data from {table_name}: {e}")
-        return pd.DataFrame()
+        conn.session.rollback()
+        st.error(f"Error loading database catalog: {e}")
+        return {}
+
+KNOWLEDGE_TABLES = ("knowledgeoverviews", "knowledgecontents")
+
+def invalidate_cache(table_name=None):
+    """Drop cached catalog and row counts after writes or schema changes"""
+    load_catalog.clear()
+    count_rows.clear()
+    if table_name in KNOWLEDGE_TABLES:
+        # 知识库表被修改后立即唤醒后台索引线程，而不是等下一个同步周期
+        from utils.knowledge_indexer import request_sync
+        request_sync()
+
+def get_table_names(conn):
+    return list(get_catalog(conn))
 
 def get_table_schema(conn, table_name):
-    try:
-        query = text("""
-            SELECT 
-                column_name, 
-                data_type, 
-                is_nullable,
-                column_default
-            FROM information_schema.columns 
-            WHERE table_name = :table_name 
-            ORDER BY ordinal_position;
-        """)
-        result = conn.session.execute(query, {"table_name": table_name})
-        schema = []
-        for row in result.fetchall():
-            schema.append({
-                "Column Name": row[0],
-                "Data Type": row[1],
-                "Nullable": row[2],
-                "Default": row[3] if row[3] else "None"
-            })
-        return schema
-    except Exception as e:
-        st.error(f"Error fetching schema for {table_name}: {e}")
-        return []
+    return get_catalog(conn).get(table_name, {}).get("columns", [])
+
+def get_primary_keys(conn, table_name):
+    return get_catalog(conn).get(table_name, {}).get("primary_keys", [])
 
 def get_primary_key(conn, table_name):
+    primary_keys = get_primary_keys(conn, table_name)
+    return primary_keys[0] if primary_keys else None
+
+@st.cache_data(ttl=get_config("admin", "count_cache_ttl", 300), show_spinner=False)
+def count_rows(_conn, table_name):
+    return _conn.session.execute(text(f"SELECT COUNT(*) FROM {quote_ident(table_name)}")).scalar_one()
+
+def get_row_count(conn, table_name):
+    """Return (count, exact): the planner estimate for large tables, a cached COUNT(*) for small ones"""
+    estimate = get_catalog(conn).get(table_name, {}).get("estimate")
+    # reltuples 为 -1 表示表还没有被 ANALYZE 过，此时只能精确计数
+    if estimate is not None and estimate >= EXACT_COUNT_THRESHOLD:
+        return int(estimate), False
+    return count_rows(conn, table_name), True
+
+def escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def filter_condition(filter_column, filter_text, exact=False):
+    """SQL condition and params matching filter_text against a column rendered as text"""
+    if exact:
+        return f"CAST({quote_ident(filter_column)} AS TEXT) = :pattern", {"pattern": filter_text}
+    return f"CAST({quote_ident(filter_column)} AS TEXT) ILIKE :pattern", {"pattern": f"%{escape_like(filter_text)}%"}
+
+def key_condition(primary_keys):
+    columns = ", ".join(quote_ident(k) for k in primary_keys)
+    values = ", ".join(f":k{i}" for i in range(len(primary_keys)))
+    return f"({columns}) = ({values})"
+
+def label_column(schema, primary_keys):
+    """First text column that is not part of the key, used to give picker entries a readable name"""
+    return next((c["Column Name"] for c in schema
+                 if c["Column Name"] not in primary_keys and c["Data Type"] in TEXT_TYPES and not c["Generated"]), None)
+
+def search_records(conn, table_name, primary_keys, label, search="", limit=PICKER_LIMIT):
+    """Return up to limit (key, label) pairs whose first key column or label starts with search"""
+    keys = ", ".join(quote_ident(k) for k in primary_keys)
+    label_sql = f"substr(CAST({quote_ident(label)} AS TEXT), 1, 60)" if label else "NULL"
+    conditions, params = [], {"limit": limit}
+    if search:
+        params["prefix"] = f"{escape_like(search)}%"
+        conditions.append(f"CAST({quote_ident(primary_keys[0])} AS TEXT) LIKE :prefix")
+        if label:
+            conditions.append(f"{quote_ident(label)} ILIKE :prefix")
+    where = f"WHERE {' OR '.join(conditions)}" if conditions else ""
+    query = text(f"SELECT {keys}, {label_sql} FROM {quote_ident(table_name)} {where} ORDER BY {keys} LIMIT :limit")
+    return [(tuple(row[:-1]), row[-1]) for row in conn.session.execute(query, params)]
+
+def get_record(conn, table_name, primary_keys, key):
+    query = text(f"SELECT * FROM {quote_ident(table_name)} WHERE {key_condition(primary_keys)}")
+    return conn.session.execute(query, {f"k{i}": value for i, value in enumerate(key)}).mappings().first()
+
+def record_picker(conn, table_name, primary_keys, key, multiple=False):
+    """Searchable record selector that only ever loads PICKER_LIMIT matching keys from the server"""
+    label = label_column(get_table_schema(conn, table_name), primary_keys)
+    search = st.text_input(
+        f"Search by {' / '.join([primary_keys[0]] + ([label] if label else []))}",
+        key=f"{key}_search", placeholder="Starts with..."
+    )
     try:
-        query = text(f"""
-            SELECT a.attname
-            FROM pg_index i
-            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
-            WHERE i.indrelid = '{table_name}'::regclass AND i.indisprimary;
-        """)
-        result = conn.session.execute(query, {"table_name": table_name})
-        primary_keys = [row[0] for row in result.fetchall()]
-        return primary_keys[0] if primary_keys else None
+        matches = search_records(conn, table_name, primary_keys, label, search.strip())
     except Exception as e:
-        st.error(f"Error fetching primary key for {table_name}: {e}")
-        return None
+        conn.session.rollback()
+        st.error(f"Error searching {table_name}: {e}")
+        matches = []
+
+    # 记住出现过的标签，已选中的记录在换了搜索词之后仍能正常显示
+    labels = st.session_state.setdefault(f"{key}_labels", {})
+    labels.update(matches)
+    format_func = lambda k: f"{', '.join(str(v) for v in k)} - {labels.get(k) or ''}"
+    options = [k for k, _ in matches]
+    if len(matches) == PICKER_LIMIT:
+        st.caption(f"Showing the first {PICKER_LIMIT} matches, refine the search to narrow them down")
+
+    if multiple:
+        selected = st.session_state.get(f"{key}_select", [])
+        options = selected + [k for k in options if k not in selected]
+        return st.multiselect("Select records", options, key=f"{key}_select", format_func=format_func)
+    return st.selectbox("Select Record", options, key=f"{key}_select", format_func=format_func, index=None)
+
+def get_table_page(conn, table_name, primary_keys, sort_column, descending=False,
+                   filter_column=None, filter_text="", cursor=None, page_size=100):
+    """Fetch one page ordered by (sort_column, primary key) using keyset pagination.
+
+    cursor is the ordering values of the last row on the previous page; returns
+    (rows, next_cursor) where next_cursor is None on the last page.
+    """
+    key_columns = [k for k in primary_keys if k != sort_column]
+    sort_is_key = sort_column in primary_keys
+    order_columns = [sort_column] + key_columns
+    direction = "DESC" if descending else "ASC"
+    op = "<" if descending else ">"
+
+    conditions, params = [], {"limit": page_size + 1}
+    if filter_column and filter_text:
+        condition, filter_params = filter_condition(filter_column, filter_text)
+        conditions.append(condition)
+        params.update(filter_params)
+
+    if cursor is not None:
+        params.update({f"c{i}": value for i, value in enumerate(cursor)})
+        if sort_is_key:
+            columns = ", ".join(quote_ident(c) for c in order_columns)
+            values = ", ".join(f":c{i}" for i in range(len(order_columns)))
+            conditions.append(f"({columns}) {op} ({values})")
+        else:
+            # 排序列可能为 NULL，NULL 行排在最后，需要单独处理
+            sort = quote_ident(sort_column)
+            keys = ", ".join(quote_ident(c) for c in key_columns)
+            key_values = ", ".join(f":c{i + 1}" for i in range(len(key_columns)))
+            after_key = f"({keys}) {op} ({key_values})" if key_columns else "FALSE"
+            if cursor[0] is None:
+                conditions.append(f"({sort} IS NULL AND {after_key})")
+            else:
+                conditions.append(f"({sort} {op} :c0 OR ({sort} = :c0 AND {after_key}) OR {sort} IS NULL)")
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order_by = ", ".join(f"{quote_ident(c)} {direction}" + ("" if sort_is_key or i else " NULLS LAST")
+                         for i, c in enumerate(order_columns))
+    query = text(f"SELECT * FROM {quote_ident(table_name)} {where} ORDER BY {order_by} LIMIT :limit")
+    rows = conn.session.execute(query, params).mappings().all()
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = tuple(rows[-1][c] for c in order_columns)
+    return rows, next_cursor
 
 def show_database_overview(conn):
     st.subheader("📊 Database Overview")
@@ -113,41 +278,94 @@ def show_database_overview(conn):
     selected_table = st.selectbox("Select Table", tables, key="overview_table")
     
     if selected_table:
-        df = get_table_data(conn, selected_table)
-        
-        if not df.empty:
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("Total Records", len(df))
-            with col2:
-                st.metric("Columns", len(df.columns))
-            with col3:
-                primary_key = get_primary_key(conn, selected_table)
-                st.metric("Primary Key", primary_key or "None")
-            
-            st.subheader(f"Data Preview - {selected_table}")
-            st.dataframe(df, use_container_width=True, height=300)
-            
-            st.subheader("Table Structure")
-            schema = get_table_schema(conn, selected_table)
-            if schema:
-                st.dataframe(pd.DataFrame(schema), use_container_width=True)
-            
-            col1, col2 = st.columns(2)
-            with col1:
-                if st.button("🔄 Refresh Data", use_container_width=True):
-                    st.rerun()
-            with col2:
-                csv = df.to_csv(index=False)
-                st.download_button(
-                    "📥 Export CSV",
-                    csv,
-                    f"{selected_table}_export.csv",
-                    "text/csv",
-                    use_container_width=True
-                )
-        else:
+        schema = get_table_schema(conn, selected_table)
+        primary_keys = get_primary_keys(conn, selected_table)
+        columns = [c["Column Name"] for c in schema]
+        total, exact = get_row_count(conn, selected_table)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Total Records", f"{total:,}" if exact else f"~{total:,}",
+                      help=None if exact else "Planner estimate from pg_class.reltuples")
+        with col2:
+            st.metric("Columns", len(columns))
+        with col3:
+            st.metric("Primary Key", ", ".join(primary_keys) or "None")
+
+        st.subheader(f"Data Preview - {selected_table}")
+        col1, col2, col3, col4, col5 = st.columns([2, 1, 2, 2, 1])
+        with col1:
+            sort_column = st.selectbox("Sort By", columns, key=f"overview_sort_{selected_table}",
+                                       index=columns.index(primary_keys[0]) if primary_keys else 0)
+        with col2:
+            descending = st.checkbox("Descending", key=f"overview_desc_{selected_table}")
+        with col3:
+            filter_column = st.selectbox("Filter Column", [None] + columns, key=f"overview_filter_col_{selected_table}",
+                                         format_func=lambda c: "(none)" if c is None else c)
+        with col4:
+            filter_text = st.text_input("Contains", key=f"overview_filter_{selected_table}",
+                                        disabled=filter_column is None)
+        with col5:
+            default_size = get_config("admin", "page_size", 100)
+            page_size = st.selectbox("Rows", PAGE_SIZES, key="overview_page_size",
+                                     index=PAGE_SIZES.index(default_size) if default_size in PAGE_SIZES else 2)
+
+        if not primary_keys:
+            st.info("This table has no primary key, only the first page can be browsed.")
+
+        # 每一页记录上一页最后一行的排序键；条件变化时回到第一页
+        browse_key = (selected_table, sort_column, descending, filter_column, filter_text, page_size)
+        if st.session_state.get("overview_browse_key") != browse_key:
+            st.session_state.overview_browse_key = browse_key
+            st.session_state.overview_cursors = [None]
+        cursors = st.session_state.overview_cursors
+
+        try:
+            rows, next_cursor = get_table_page(conn, selected_table, primary_keys, sort_column, descending,
+                                               filter_column, filter_text, cursors[-1], page_size)
+        except Exception as e:
+            conn.session.rollback()
+            st.error(f"Error fetching data from {selected_table}: {e}")
+            return
+        if not primary_keys:
+            next_cursor = None
+        df = pd.DataFrame(rows, columns=columns)
+
+        if df.empty and len(cursors) == 1 and not filter_text:
             st.warning(f"No data found in table '{selected_table}'")
+        else:
+            st.dataframe(df, use_container_width=True, height=300, hide_index=True)
+
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Previous", use_container_width=True, disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            st.caption(f"Page {len(cursors)} · {len(df)} rows")
+        with col3:
+            if st.button("Next ➡️", use_container_width=True, disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
+
+        st.subheader("Table Structure")
+        if schema:
+            st.dataframe(pd.DataFrame(schema), use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("🔄 Refresh Data", use_container_width=True):
+                invalidate_cache(selected_table)
+                st.rerun()
+        with col2:
+            csv = df.to_csv(index=False)
+            st.download_button(
+                "📥 Export Page CSV",
+                csv,
+                f"{selected_table}_page{len(cursors)}_export.csv",
+                "text/csv",
+                use_container_width=True
+            )
 
 def show_add_records(conn):
     st.subheader("➕ Add New Records")
@@ -160,6 +378,11 @@ def show_add_records(conn):
     selected_table = st.selectbox("Select Table", tables, key="add_table")
     
     if selected_table:
+        mode = st.radio("Add", ["Single Record", "Bulk Import"], horizontal=True, key="add_mode")
+        if mode == "Bulk Import":
+            show_bulk_import(conn, selected_table)
+            return
+
         schema = get_table_schema(conn, selected_table)
         
         if schema:
@@ -172,7 +395,7 @@ def show_add_records(conn):
                 for column_info in schema:
                     column_name = column_info["Column Name"]
                     data_type = column_info["Data Type"]
-                    if "nextval" in str(column_info["Default"]):
+                    if "nextval" in str(column_info["Default"]) or column_info["Generated"] or column_info["Identity"]:
                         continue
                         
                     if data_type in ['integer', 'bigint', 'smallint']:
@@ -196,10 +419,73 @@ def show_add_records(conn):
                 submitted = st.form_submit_button("💾 Add Record")
                 
                 if submitted:
-                    if add_record(conn, selected_table, input_data):
-                        st.success("Record added successfully!")
+                    new_key = add_record(conn, selected_table, input_data, get_primary_key(conn, selected_table))
+                    if new_key is not False:
+                        st.success(f"Record added successfully! (ID: {new_key})" if new_key is not None else "Record added successfully!")
                         st.rerun()
 
+def show_bulk_import(conn, table_name):
+    schema = get_table_schema(conn, table_name)
+    if not schema:
+        return
+
+    uploaded_file = st.file_uploader("Upload CSV or Excel file", type=["csv", "xlsx", "xls"], key="bulk_import_file")
+    if uploaded_file is None:
+        st.info("The first row must contain column names matching the table's columns.")
+        return
+
+    try:
+        header = next(iter_upload_chunks(uploaded_file, uploaded_file.name, chunk_rows=5))
+    except Exception as e:
+        st.error(f"Error reading {uploaded_file.name}: {e}")
+        return
+    columns = list(header.columns)
+    st.write("### Preview")
+    st.dataframe(header, use_container_width=True, hide_index=True)
+
+    problems = validate_columns(columns, schema)
+    for problem in problems:
+        st.error(problem)
+    if problems:
+        return
+
+    primary_keys = get_primary_keys(conn, table_name)
+    on_conflict = st.radio(
+        "On primary key conflict", CONFLICT_MODES, horizontal=True, key="bulk_import_conflict",
+        format_func={"error": "Abort import", "skip": "Skip existing rows", "upsert": "Update existing rows"}.get,
+        disabled=not primary_keys
+    )
+
+    if st.button("📥 Import", type="primary"):
+        identity_columns = [c["Column Name"] for c in schema if c["Identity"]]
+        status = st.empty()
+        try:
+            report = bulk_load(
+                conn.session, table_name, iter_upload_chunks(uploaded_file, uploaded_file.name), columns,
+                primary_keys, identity_columns, on_conflict if primary_keys else "error",
+                progress=lambda rows: status.caption(f"Copied {rows:,} rows...")
+            )
+        except Exception as e:
+            status.empty()
+            st.error(f"Import failed, no rows were written: {e}")
+            return
+        status.empty()
+        invalidate_cache(table_name)
+
+        st.success(f"Imported {uploaded_file.name} into {table_name}")
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            st.metric("Rows Read", f"{report['rows_read']:,}")
+        with col2:
+            st.metric("Inserted", f"{report['inserted']:,}")
+        with col3:
+            st.metric("Updated", f"{report['updated']:,}")
+        with col4:
+            st.metric("Skipped", f"{report['skipped']:,}")
+        with col5:
+            st.metric("Throughput", f"{report['rows_per_sec']:,} rows/s")
+        st.caption(f"COPY took {report['copy_seconds']}s, {report['total_seconds']}s in total")
+
 def show_edit_records(conn):
     st.subheader("✏️ Edit Records")
     
@@ -211,45 +497,46 @@ def show_edit_records(conn):
     selected_table = st.selectbox("Select Table", tables, key="edit_table")
     
     if selected_table:
-        df = get_table_data(conn, selected_table)
-        primary_key = get_primary_key(conn, selected_table)
+        primary_keys = get_primary_keys(conn, selected_table)
         
-        if not df.empty and primary_key:
+        if primary_keys:
             st.write("### Select Record to Edit")
             
-            record_options = [f"{row[primary_key]} - {row.to_dict()}" for _, row in df.iterrows()]
-            
-            selected_record_idx = st.selectbox(
-                "Select Record", 
-                options=range(len(df)),
-                format_func=lambda x: record_options[x]
-            )
+            selected_key = record_picker(conn, selected_table, primary_keys, f"edit_picker_{selected_table}")
             
-            if selected_record_idx is not None:
-                record_data = df.iloc[selected_record_idx].to_dict()
-                
+            record_data = get_record(conn, selected_table, primary_keys, selected_key) if selected_key else None
+            if record_data is not None:
                 with st.form(key="edit_record_form"):
                     st.write("### Edit Record")
                     
                     edited_data = {}
-                    for column in df.columns:
+                    for column_info in get_table_schema(conn, selected_table):
+                        column = column_info["Column Name"]
+                        data_type = column_info["Data Type"]
+                        # 生成列（如全文检索的 searchvector）由数据库维护，不能编辑
+                        if column_info["Generated"]:
+                            continue
                         current_value = record_data[column]
                         
-                        if pd.isna(current_value):
-                            current_value = None
-                        
-                        if df[column].dtype in ['int64', 'float64']:
+                        if data_type in INTEGER_TYPES:
+                            edited_data[column] = st.number_input(
+                                f"{column}", 
+                                value=int(current_value) if current_value is not None else 0, step=1
+                            )
+                        elif data_type in DECIMAL_TYPES:
                             edited_data[column] = st.number_input(
                                 f"{column}", 
                                 value=float(current_value) if current_value is not None else 0.0
                             )
-                        elif df[column].dtype == 'bool':
+                        elif data_type == 'boolean':
                             edited_data[column] = st.checkbox(column, value=bool(current_value) if current_value is not None else False)
                         else:
-                            edited_data[column] = st.text_input(
+                            value = st.text_input(
                                 f"{column}", 
                                 value=str(current_value) if current_value is not None else ""
                             )
+                            # 日期等非文本列留空时写入 NULL
+                            edited_data[column] = None if value == "" and data_type not in TEXT_TYPES else value
                     
                     col1, col2 = st.columns(2)
                     with col1:
@@ -259,11 +546,11 @@ def show_edit_records(conn):
                             st.rerun()
                     
                     if submitted:
-                        if update_record(conn, selected_table, primary_key, record_data[primary_key], edited_data):
+                        if update_record(conn, selected_table, primary_keys, selected_key, edited_data):
                             st.success("Record updated successfully!")
                             st.rerun()
         else:
-            st.warning("No primary key found or table is empty")
+            st.warning("No primary key found for this table")
 
 def show_delete_records(conn):
     st.subheader("🗑️ Delete Records")
@@ -276,32 +563,76 @@ def show_delete_records(conn):
     selected_table = st.selectbox("Select Table", tables, key="delete_table")
     
     if selected_table:
-        df = get_table_data(conn, selected_table)
-        primary_key = get_primary_key(conn, selected_table)
+        mode = st.radio("Delete", ["Selected Records", "By Filter"], horizontal=True, key="delete_mode")
+        if mode == "By Filter":
+            show_delete_by_filter(conn, selected_table)
+            return
+
+        primary_keys = get_primary_keys(conn, selected_table)
         
-        if not df.empty and primary_key:
+        if primary_keys:
             st.warning("⚠️ Warning: This action cannot be undone!")
  
-            record_options = [f"{row[primary_key]} - {row.to_dict()}" for _, row in df.iterrows()]
-            
-            records_to_delete = st.multiselect(
-                "Select records to delete", 
-                options=range(len(df)),
-                format_func=lambda x: record_options[x]
-            )
+            records_to_delete = record_picker(conn, selected_table, primary_keys,
+                                              f"delete_picker_{selected_table}", multiple=True)
             
             if records_to_delete:
                 st.write(f"Selected {len(records_to_delete)} records for deletion")
                 
                 if st.button("🔥 Confirm Delete", type="secondary"):
-                    success_count = 0
-                    for record_idx in records_to_delete:
-                        record_data = df.iloc[record_idx]
-                        if delete_record(conn, selected_table, primary_key, record_data[primary_key]):
-                            success_count += 1
-                    
-                    st.success(f"Deleted {success_count} records successfully!")
-                    st.rerun()
+                    deleted = delete_records(conn, selected_table, primary_keys, records_to_delete)
+                    if deleted is not None:
+                        st.session_state.pop(f"delete_picker_{selected_table}_select", None)
+                        st.success(f"Deleted {deleted} records successfully!")
+                        st.rerun()
+        else:
+            st.warning("No primary key found for this table")
+
+def show_delete_by_filter(conn, table_name):
+    columns = [c["Column Name"] for c in get_table_schema(conn, table_name)]
+    if not columns:
+        return
+
+    col1, col2, col3 = st.columns([2, 1, 3])
+    with col1:
+        filter_column = st.selectbox("Column", columns, key="delete_filter_column")
+    with col2:
+        match = st.selectbox("Match", ["equals", "contains"], key="delete_filter_match")
+    with col3:
+        filter_text = st.text_input("Value", key="delete_filter_value")
+
+    if not filter_text:
+        st.info("Enter a value to match, then run a dry run to see how many rows would be deleted.")
+        return
+
+    condition, params = filter_condition(filter_column, filter_text, exact=match == "equals")
+    # 试运行的条件变化后，必须重新试运行才能删除
+    dry_run_key = (table_name, condition, filter_text)
+    if st.button("🔍 Dry Run"):
+        try:
+            count = conn.session.execute(
+                text(f"SELECT COUNT(*) FROM {quote_ident(table_name)} WHERE {condition}"), params
+            ).scalar_one()
+            st.session_state.delete_dry_run = (dry_run_key, count)
+        except Exception as e:
+            conn.session.rollback()
+            st.error(f"Error counting records: {e}")
+
+    dry_run = st.session_state.get("delete_dry_run")
+    if not dry_run or dry_run[0] != dry_run_key:
+        return
+
+    count = dry_run[1]
+    if count == 0:
+        st.info("No records match this filter.")
+        return
+
+    st.warning(f"⚠️ {count:,} records match `{filter_column}` {match} '{filter_text}'. This action cannot be undone!")
+    if st.button(f"🔥 Delete {count:,} Records", type="secondary"):
+        deleted = delete_where(conn, table_name, condition, params)
+        st.session_state.pop("delete_dry_run", None)
+        if deleted is not None:
+            st.success(f"Deleted {deleted} records successfully!")
 
 def show_database_tools(conn):
     st.subheader("⚙️ Database Tools")
@@ -312,6 +643,7 @@ def show_database_tools(conn):
         st.write("### 🔄 Database Operations")
         
         if st.button("🔄 Refresh Database Cache", use_container_width=True):
+            invalidate_cache()
             st.success("Database cache refreshed!")
             st.rerun()
         
@@ -324,45 +656,124 @@ def show_database_tools(conn):
         if st.button("📊 Export Schema", use_container_width=True):
             export_schema(conn)
 
-def add_record(conn, table_name, data):
+    st.write("### 🔌 Connection Pool")
+    stats = pool_stats()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Checked Out", f"{stats['checked_out']} / {stats['pool_size']}")
+    with col2:
+        st.metric("Overflow", stats['overflow'])
+    with col3:
+        st.metric("Avg Checkout Wait", f"{stats['avg_wait_ms']:.1f} ms")
+    with col4:
+        st.metric("Max Checkout Wait", f"{stats['max_wait_ms']:.1f} ms")
+
+    with st.expander("Recent Queries"):
+        queries = query_stats.recent_queries()
+        if queries:
+            st.dataframe(pd.DataFrame([
+                {"Time": datetime.fromtimestamp(ts).strftime("%H:%M:%S"), "SQL": sql, "Duration (ms)": round(seconds * 1000, 2),
+                 "Rows": rowcount, "Caller": where, "Error": error}
+                for ts, sql, seconds, rowcount, where, error in queries
+            ]), use_container_width=True)
+        else:
+            st.info("No queries recorded yet.")
+
+def show_performance():
+    st.subheader("⏱️ Query Performance")
+    st.caption("Every SQL statement run by this server process, grouped by its parameter-free fingerprint")
+
+    summary = query_stats.fingerprint_summary()
+    if not summary:
+        st.info("No queries recorded yet.")
+        return
+
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        st.metric("Distinct Queries", len(summary))
+    with col2:
+        if st.button("♻️ Reset Statistics", use_container_width=True):
+            query_stats.reset()
+            st.rerun()
+
+    st.write("### Latency by Fingerprint")
+    st.dataframe(pd.DataFrame(summary), use_container_width=True, hide_index=True)
+
+    st.write("### Slowest Queries")
+    st.dataframe(pd.DataFrame(query_stats.slowest_queries()), use_container_width=True, hide_index=True)
+
+def add_record(conn, table_name, data, primary_key=None):
     try:
         columns = ', '.join(data.keys())
         placeholders = ', '.join([f":{key}" for key in data.keys()])
         
         query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-        conn.session.execute(query, data)
-        conn.session.commit()
-        return True
+        if primary_key:
+            # 主键由 identity 列生成时，通过 RETURNING 取回新 ID
+            query += f" RETURNING {primary_key}"
+        with conn.session as s:
+            try:
+                result = s.execute(text(query), data)
+                new_key = result.scalar_one() if primary_key else None
+                s.commit()
+            except Exception:
+                s.rollback()
+                raise
+        invalidate_cache(table_name)
+        return new_key
     except Exception as e:
         st.error(f"Error adding record: {e}")
-        conn.session.rollback()
         return False
 
-def update_record(conn, table_name, primary_key, key_value, data):
+def update_record(conn, table_name, primary_keys, key_values, data):
     try:
-        set_clause = ', '.join([f"{key} = :{key}" for key in data.keys()])
+        set_clause = ', '.join([f"{quote_ident(key)} = :{key}" for key in data.keys()])
         params = data.copy()
-        params['key_value'] = key_value
+        params.update({f"k{i}": value for i, value in enumerate(key_values)})
         
-        query = f"UPDATE {table_name} SET {set_clause} WHERE {primary_key} = :key_value"
-        conn.session.execute(query, params)
-        conn.session.commit()
+        query = f"UPDATE {quote_ident(table_name)} SET {set_clause} WHERE {key_condition(primary_keys)}"
+        with conn.session as s:
+            try:
+                s.execute(text(query), params)
+                s.commit()
+            except Exception:
+                s.rollback()
+                raise
+        invalidate_cache(table_name)
         return True
     except Exception as e:
         st.error(f"Error updating record: {e}")
-        conn.session.rollback()
         return False
 
-def delete_record(conn, table_name, primary_key, key_value):
+def delete_records(conn, table_name, primary_keys, key_rows):
+    """Delete rows by primary key in one statement and one transaction, returning the affected-row count"""
     try:
-        query = f"DELETE FROM {table_name} WHERE {primary_key} = :key_value"
-        conn.session.execute(query, {"key_value": key_value})
-        conn.session.commit()
-        return True
+        params = {f"k{i}": [row[i] for row in key_rows] for i in range(len(primary_keys))}
+        if len(primary_keys) == 1:
+            condition = f"{quote_ident(primary_keys[0])} = ANY(:k0)"
+        else:
+            # 复合主键：unnest 多个数组得到 (k0, k1, ...) 元组集合
+            columns = ", ".join(quote_ident(k) for k in primary_keys)
+            arrays = ", ".join(f":k{i}" for i in range(len(primary_keys)))
+            condition = f"({columns}) IN (SELECT * FROM unnest({arrays}))"
+        return delete_where(conn, table_name, condition, params)
     except Exception as e:
-        st.error(f"Error deleting record: {e}")
-        conn.session.rollback()
-        return False
+        st.error(f"Error deleting records: {e}")
+        return None
+
+def delete_where(conn, table_name, condition, params):
+    # conn.session 每次访问都返回新的 Session，执行和提交必须在同一个 Session 上
+    with conn.session as s:
+        try:
+            extend_statement_timeout(s)
+            result = s.execute(text(f"DELETE FROM {quote_ident(table_name)} WHERE {condition}"), params)
+            s.commit()
+        except Exception as e:
+            s.rollback()
+            st.error(f"Error deleting records: {e}")
+            return None
+    invalidate_cache(table_name)
+    return result.rowcount
 
 def show_database_info(conn):
     try:
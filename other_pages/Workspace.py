@@ -1,5 +1,6 @@
 import streamlit as st
 import pandas as pd
+import io
 import json
 from datetime import datetime
 from utils.session_state import (
@@ -8,9 +9,11 @@ from utils.session_state import (
 )
 from utils.data_utils import (
     fetch_notion_database, apply_clean_code,
-    df_to_excel_bytes, extract_database_id_from_url
+    df_to_excel_bytes, extract_database_id_from_url, read_csv_bytes
 )
 from utils.chart_utils import create_chart_from_config
+from utils.dataset_store import memory_report
+from utils.dataset_cache import get_dataset_cache
 from main_pages.Dashboard import add_chart_to_dashboard
 
 
@@ -67,6 +70,21 @@ def show_data_import():
     elif source_type.startswith("Notion") and NOTION_AVAILABLE:
         show_notion_import()
 
+def parse_csv(data, csv_sep):
+    try:
+        # 编码只根据文件头尾的采样判断一次，然后只解析一遍
+        df, encoding = read_csv_bytes(data, sep=csv_sep)
+        return df, {"encoding": encoding}
+    except (UnicodeDecodeError, pd.errors.EmptyDataError, pd.errors.ParserError):
+        raise ValueError("If the CSV file cannot be read, please check the file format or encoding")
+
+def parse_excel(data, sheet):
+    return pd.read_excel(io.BytesIO(data), sheet_name=sheet), {}
+
+def show_cache_source(parse_info):
+    if parse_info["cache"] != "parsed":
+        st.caption(f"⚡ Reused an identical file already parsed on this server ({parse_info['cache']} cache)")
+
 def show_file_import():
     set_session_state("source_type", "file")
     
@@ -83,33 +101,30 @@ def show_file_import():
             table_name = st.text_input("Name of Data Sheet", value=file.name.replace('.csv', ''), key="csv_table_name")
             
             if st.button("Import data", key="import_csv"):
-                encodings_to_try = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig', 'cp936', 'latin1']
-                success = False
-                
-                for encoding in encodings_to_try:
-                    try:
-                        file.seek(0)
-                        df = pd.read_csv(file, sep=csv_sep, encoding=encoding)
-                        source_info = {
-                            "type": "csv",
-                            "filename": file.name,
-                            "encoding": encoding,
-                            "separator": csv_sep,
-                            "import_time": datetime.now().isoformat()
-                        }
-                        add_dataset(table_name, df, source_info)
-                        if encoding == 'utf-8':
-                            st.success(f"CSV import successfully：{len(df):,} row，{len(df.columns)} columns")
-                        else:
-                            st.success(f"CSV import successfully（The encoding is {encoding}）：{len(df):,} row, {len(df.columns)} columns")
-                        st.dataframe(df.head(50), use_container_width=True)
-                        success = True
-                        break
-                    except (UnicodeDecodeError, pd.errors.EmptyDataError, pd.errors.ParserError):
-                        continue
-                
-                if not success:
-                    st.error("If the CSV file cannot be read, please check the file format or encoding")
+                try:
+                    # 同一文件（内容哈希 + 解析参数相同）在整个服务器上只解析一次，各会话共享
+                    df, parse_info = get_dataset_cache().get_or_parse(
+                        file.getvalue(), {"type": "csv", "separator": csv_sep},
+                        lambda: parse_csv(file.getvalue(), csv_sep)
+                    )
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    encoding = parse_info["encoding"]
+                    source_info = {
+                        "type": "csv",
+                        "filename": file.name,
+                        "encoding": encoding,
+                        "separator": csv_sep,
+                        "import_time": datetime.now().isoformat()
+                    }
+                    add_dataset(table_name, df, source_info)
+                    if encoding == 'utf-8':
+                        st.success(f"CSV import successfully：{len(df):,} row，{len(df.columns)} columns")
+                    else:
+                        st.success(f"CSV import successfully（The encoding is {encoding}）：{len(df):,} row, {len(df.columns)} columns")
+                    show_cache_source(parse_info)
+                    st.dataframe(df.head(50), use_container_width=True)
         
         else: 
             set_session_state("file_type", "excel")
@@ -121,7 +136,10 @@ def show_file_import():
             
             if st.button("Import Data", key="import_excel"):
                 try:
-                    df = pd.read_excel(file, sheet_name=sheet)
+                    df, parse_info = get_dataset_cache().get_or_parse(
+                        file.getvalue(), {"type": "excel", "sheet_name": sheet},
+                        lambda: parse_excel(file.getvalue(), sheet)
+                    )
                     source_info = {
                         "type": "excel",
                         "filename": file.name,
@@ -130,6 +148,7 @@ def show_file_import():
                     }
                     add_dataset(table_name, df, source_info)
                     st.success(f"Excel import successfully：{len(df):,} row, {len(df.columns)} columns（Sheet：{sheet}）")
+                    show_cache_source(parse_info)
                     st.dataframe(df.head(50), use_container_width=True)
                 except Exception as e:
                     st.error(f"Fail to load Excel：{e}")
@@ -263,10 +282,20 @@ def show_data_cleaning():
         st.info("There is no raw data in current sheet")
         return
     
+    show_memory_usage()
     show_common_cleaning_operations()
     show_advanced_cleaning()
     show_data_preview()
 
+def show_memory_usage():
+    report = memory_report(get_session_state("datasets", {}))
+    with st.expander(f"💾 Session Memory: {report['total_bytes'] / 1024 ** 2:,.1f} MB"):
+        st.caption("Cleaned tables share unchanged columns with the raw data, shared memory is only counted once")
+        st.dataframe(pd.DataFrame(report["tables"]), use_container_width=True, hide_index=True)
+        cache = get_dataset_cache().stats()
+        st.caption(f"Server dataset cache: {cache['datasets']} files, {cache['memory_mb']:,} / {cache['max_memory_mb']:,} MB, "
+                   f"{cache['hits']} memory hits, {cache['disk_hits']} disk hits, {cache['misses']} parses")
+
 def show_common_cleaning_operations():
     st.markdown("#### :1234: Commonly Used Data Cleaning Operations")
     current_table = get_session_state("current_table")
@@ -296,7 +325,7 @@ def show_common_cleaning_operations():
             if st.button("🧹 Run Remove", key="btn_trim"):
                 if selected_col_trim != "Please Select":
                     try:
-                        df_work = current_df.copy()
+                        df_work = current_df.copy(deep=False)
                         if trim_type == "Spaces Front and Back":
                             df_work[selected_col_trim] = df_work[selected_col_trim].astype(str).str.strip()
                         elif trim_type == "All Spaces":
@@ -321,7 +350,7 @@ def show_common_cleaning_operations():
             
             if st.button("🗑️ Delete Duplicate Rows", key="btn_dedup"):
                 try:
-                    df_work = current_df.copy()
+                    df_work = current_df.copy(deep=False)
                     subset_cols = duplicate_cols if duplicate_cols else None
                     keep_val = "first" if keep_option == "First" else "last"
                     
@@ -342,7 +371,7 @@ def show_common_cleaning_operations():
             
             if st.button("🚫 Delete Null Rows", key="btn_dropna"):
                 try:
-                    df_work = current_df.copy()
+                    df_work = current_df.copy(deep=False)
                     subset_cols = null_cols if null_cols else None
                     how_val = "any" if null_how == "Any column is empty" else "all"
                     
@@ -350,7 +379,7 @@ def show_common_cleaning_operations():
                     df_work = df_work.dropna(subset=subset_cols, how=how_val)
                     removed_count = original_count - len(df_work)
                     
-                    set_session_state("clean_df", df_work)
+                    update_clean_data(current_table, df_work)
                     st.success(f"Delete {removed_count} null rows, left {len(df_work)} rows")
                     st.rerun()
                 except Exception as e:
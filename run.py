@@ -1,7 +1,10 @@
 import streamlit as st
 from other_pages.Login import check_password, is_admin
 from other_pages import Admin
+from utils.model_registry import start_warm_up
 st.set_page_config(page_title=" ")
+# 可选：服务启动时在后台预加载模型（secrets.toml 中 [models] warmup = true）
+start_warm_up()
 user_role = is_admin()
 if not check_password(): 
     st.stop()
@@ -0,0 +1,109 @@
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from utils.config import get_config
+
+CACHE_FILE = "vectorstore/answer_cache.json"
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_TTL_SECONDS = 24 * 3600
+DEFAULT_MAX_ENTRIES = 500
+
+
+def normalize_question(question: str) -> str:
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip("?!.。？！ ")
+
+
+class AnswerCache:
+    """Semantic cache of assistant answers, scoped to one FAISS index version and persisted as JSON"""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path = path
+        self.threshold = float(get_config("answer_cache", "threshold", DEFAULT_THRESHOLD))
+        self.ttl = float(get_config("answer_cache", "ttl_seconds", DEFAULT_TTL_SECONDS))
+        self.max_entries = int(get_config("answer_cache", "max_entries", DEFAULT_MAX_ENTRIES))
+        self.lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.path)
+
+    def _expire(self, now: float):
+        self.entries = [e for e in self.entries if now - e["created"] <= self.ttl]
+
+    def _embed(self, embeddings, question: str) -> np.ndarray:
+        vector = np.asarray(embeddings.embed_query(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, embeddings, question: str, index_version: str) -> Optional[Dict]:
+        """Cached entry for a question similar enough to this one under the same index version"""
+        key = normalize_question(question)
+        # 在锁外计算向量，避免所有会话排队等待同一次 embedding
+        query = self._embed(embeddings, key)
+        with self.lock:
+            now = time.time()
+            self._expire(now)
+            candidates = [e for e in self.entries if e["index_version"] == index_version]
+            match = next((e for e in candidates if e["question"] == key), None)
+            similarity = 1.0
+            if match is None and candidates:
+                # 相同问题直接命中；否则用已加载的 MiniLM 做余弦相似度比较
+                matrix = np.asarray([e["embedding"] for e in candidates], dtype=np.float32)
+                scores = matrix @ query
+                best = int(scores.argmax())
+                if scores[best] >= self.threshold:
+                    match, similarity = candidates[best], float(scores[best])
+            if match is None:
+                return None
+            match["last_used"] = now
+            return {"answer": match["answer"], "question": match["question"], "similarity": similarity}
+
+    def store(self, embeddings, question: str, answer: str, index_version: str):
+        key = normalize_question(question)
+        embedding = self._embed(embeddings, key)
+        with self.lock:
+            now = time.time()
+            self._expire(now)
+            self.entries = [e for e in self.entries if not (e["index_version"] == index_version and e["question"] == key)]
+            self.entries.append({
+                "question": key,
+                "answer": answer,
+                "index_version": index_version,
+                "embedding": embedding.round(6).tolist(),
+                "created": now,
+                "last_used": now,
+            })
+            if len(self.entries) > self.max_entries:
+                self.entries.sort(key=lambda e: e["last_used"])
+                self.entries = self.entries[-self.max_entries:]
+            self._save()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> AnswerCache:
+    """Process-wide answer cache, loaded from disk on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache()
+        return _cache
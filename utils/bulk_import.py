@@ -0,0 +1,141 @@
+import io
+import time
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+from sqlalchemy.sql import text
+
+from utils.config import get_config
+from utils.data_utils import detect_csv_encoding
+from utils.db import extend_statement_timeout, quote_ident
+
+CONFLICT_MODES = ["error", "skip", "upsert"]
+DEFAULT_CHUNK_ROWS = 50000
+
+
+def iter_upload_chunks(file, filename: str, chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Yield the uploaded CSV/Excel file as string-typed DataFrame chunks"""
+    chunk_rows = chunk_rows or int(get_config("admin", "import_chunk_rows", DEFAULT_CHUNK_ROWS))
+    file.seek(0)
+    if filename.lower().endswith((".xlsx", ".xls")):
+        # Excel 无法流式读取，整表读入后再切块
+        df = pd.read_excel(file, dtype=str)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
+        return
+    # 分块 COPY 中途无法换编码重来，这里检查整个文件而不是只采样首尾
+    encoding = detect_csv_encoding(file.getvalue(), sample_bytes=None)
+    # 全部按字符串读取，类型转换交给 PostgreSQL，避免整数列因空值变成浮点
+    yield from pd.read_csv(file, dtype=str, encoding=encoding, chunksize=chunk_rows)
+
+
+def validate_columns(file_columns: List[str], schema: List[Dict]) -> List[str]:
+    """Return problems that would make the file unloadable into a table with this schema"""
+    problems = []
+    by_name = {c["Column Name"]: c for c in schema}
+    unknown = [c for c in file_columns if c not in by_name]
+    if unknown:
+        problems.append(f"Columns not in table: {', '.join(unknown)}")
+    generated = [c for c in file_columns if c in by_name and by_name[c]["Generated"]]
+    if generated:
+        problems.append(f"Generated columns cannot be loaded: {', '.join(generated)}")
+    missing = [
+        name for name, c in by_name.items()
+        if name not in file_columns and c["Nullable"] == "NO" and c["Default"] == "None"
+        and not c["Generated"] and not c["Identity"]
+    ]
+    if missing:
+        problems.append(f"Required columns missing: {', '.join(missing)}")
+    return problems
+
+
+def _copy_chunk(cursor, target: str, columns: List[str], chunk: pd.DataFrame) -> None:
+    buffer = io.StringIO()
+    chunk[columns].to_csv(buffer, header=False, index=False)
+    buffer.seek(0)
+    column_list = ", ".join(quote_ident(c) for c in columns)
+    cursor.copy_expert(f"COPY {target} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def bulk_load(session, table_name: str, chunks: Iterator[pd.DataFrame], columns: List[str],
+              primary_keys: List[str], identity_columns: List[str], on_conflict: str = "error",
+              progress=None) -> Dict:
+    """COPY all chunks into table_name in one transaction and return a throughput report.
+
+    on_conflict="error" copies straight into the table; "skip" and "upsert" copy into a
+    temporary staging table first and merge it with INSERT ... ON CONFLICT.
+    """
+    if on_conflict not in CONFLICT_MODES:
+        raise ValueError(f"on_conflict must be one of {CONFLICT_MODES}")
+    if on_conflict != "error" and not primary_keys:
+        raise ValueError(f"{table_name} has no primary key to detect conflicts on")
+
+    table = quote_ident(table_name)
+    column_list = ", ".join(quote_ident(c) for c in columns)
+    start = time.perf_counter()
+    rows_read = 0
+    report = {"rows_read": 0, "inserted": 0, "updated": 0, "skipped": 0}
+    try:
+        # 大文件的 COPY 和 INSERT ... ON CONFLICT 合并会超过连接池默认的 statement_timeout
+        extend_statement_timeout(session)
+        target = table
+        if on_conflict != "error":
+            target = "bulk_import_stage"
+            session.execute(text(
+                f"CREATE TEMP TABLE {target} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+            ))
+        # COPY 需要底层 psycopg2 连接，和 session 处于同一个事务中
+        cursor = session.connection().connection.cursor()
+        try:
+            for chunk in chunks:
+                _copy_chunk(cursor, target, columns, chunk)
+                rows_read += len(chunk)
+                if progress:
+                    progress(rows_read)
+        finally:
+            cursor.close()
+        copy_seconds = time.perf_counter() - start
+
+        if on_conflict == "error":
+            report["inserted"] = rows_read
+        else:
+            keys = ", ".join(quote_ident(k) for k in primary_keys)
+            updates = [c for c in columns if c not in primary_keys]
+            if on_conflict == "upsert" and updates:
+                action = "DO UPDATE SET " + ", ".join(f"{quote_ident(c)} = EXCLUDED.{quote_ident(c)}" for c in updates)
+            else:
+                action = "DO NOTHING"
+            # xmax = 0 表示新插入的行，否则是被更新的已有行
+            inserted, affected = session.execute(text(f"""
+                WITH merged AS (
+                    INSERT INTO {table} ({column_list})
+                    SELECT {column_list} FROM {target}
+                    ON CONFLICT ({keys}) {action}
+                    RETURNING xmax = 0 AS inserted
+                )
+                SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FROM merged
+            """)).one()
+            report["inserted"] = inserted
+            report["updated"] = affected - inserted
+            report["skipped"] = rows_read - affected
+
+        # 显式写入的 identity 值不会推进序列，导入后把序列移到最大值之后
+        for column in identity_columns:
+            if column in columns:
+                session.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence(:table_name, :column_name), "
+                    f"COALESCE(MAX({quote_ident(column)}), 0) + 1, false) FROM {table}"
+                ), {"table_name": table_name, "column_name": column})
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+
+    total_seconds = time.perf_counter() - start
+    report.update({
+        "rows_read": rows_read,
+        "copy_seconds": round(copy_seconds, 3),
+        "total_seconds": round(total_seconds, 3),
+        "rows_per_sec": round(rows_read / total_seconds) if total_seconds else 0,
+    })
+    return report
@@ -20,7 +20,7 @@ def create_chart_from_config(df: pd.DataFrame, config: Dict[str, Any]) -> Option
     if len(df) > sample_rows:
         df_chart = df.sample(n=sample_rows, random_state=42)
     else:
-        df_chart = df.copy()
+        df_chart = df.copy(deep=False)
     
     # Base chart object
     base = alt.Chart(df_chart)
@@ -0,0 +1,63 @@
+from typing import List, Tuple
+
+from utils.config import get_config
+
+DEFAULT_TOKEN_BUDGET = 768
+
+SUMMARY_TEMPLATE = """Progressively summarize the conversation, adding onto the previous summary and returning a new summary.
+Keep facts, names, error codes and decisions. Answer with the summary only.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{lines}
+
+New summary:"""
+
+
+def count_tokens(llm, text: str) -> int:
+    """Tokens as counted by the model's tokenizer, or a 4-characters-per-token estimate"""
+    try:
+        return llm.get_num_tokens(text)
+    except Exception:
+        return len(text) // 4 + 1
+
+
+class ChatHistory:
+    """Keep recent turns verbatim and fold older turns into a running summary once over the token budget"""
+
+    def __init__(self, token_budget: int = None):
+        self.token_budget = token_budget or int(get_config("chat_history", "token_budget", DEFAULT_TOKEN_BUDGET))
+        self.turns: List[Tuple[str, str]] = []
+        self.summary = ""
+
+    def __bool__(self):
+        return bool(self.turns or self.summary)
+
+    def add_turn(self, question: str, answer: str):
+        self.turns.append((question, answer))
+
+    def for_chain(self) -> List[Tuple[str, str]]:
+        """chat_history for ConversationalRetrievalChain"""
+        history = []
+        if self.summary:
+            history.append(("Summarize our earlier conversation.", self.summary))
+        return history + self.turns
+
+    def _text(self) -> str:
+        return "\n".join(f"Human: {q}\nAssistant: {a}" for q, a in self.for_chain())
+
+    def compact(self, llm) -> int:
+        """Once over token_budget, fold the oldest turns into the summary down to half the budget; returns turns folded"""
+        if len(self.turns) <= 1 or count_tokens(llm, self._text()) <= self.token_budget:
+            return 0
+        folded = []
+        # 一次折叠到预算的一半，摘要调用（一次完整的 LLM 生成）只在偶尔需要时发生；至少保留最近一轮原文
+        while len(self.turns) > 1 and count_tokens(llm, self._text()) > self.token_budget // 2:
+            folded.append(self.turns.pop(0))
+        if folded:
+            lines = "\n".join(f"Human: {q}\nAssistant: {a}" for q, a in folded)
+            prompt = SUMMARY_TEMPLATE.format(summary=self.summary or "(none)", lines=lines)
+            self.summary = llm.invoke(prompt).strip()
+        return len(folded)
@@ -0,0 +1,11 @@
+import streamlit as st
+from typing import Any
+
+
+def get_config(section: str, key: str, default: Any = None) -> Any:
+    """Read an optional setting from .streamlit/secrets.toml"""
+    try:
+        return st.secrets.get(section, {}).get(key, default)
+    except Exception:
+        # secrets.toml 不存在或无法解析时使用默认值
+        return default
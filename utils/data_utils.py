@@ -1,3 +1,4 @@
+import codecs
 import pandas as pd
 import requests
 import json
@@ -155,7 +156,7 @@ def fetch_notion_database(config: Dict[str, Any]) -> pd.DataFrame:
 
 def apply_clean_code(df: pd.DataFrame, code: str) -> Tuple[pd.DataFrame, str, Optional[str]]:
     if not code or not code.strip():
-        return df.copy(), "", None
+        return df.copy(deep=False), "", None
     safe_globals = {
         "pd": pd,
         "datetime": datetime,
@@ -205,7 +206,8 @@ def apply_clean_code(df: pd.DataFrame, code: str) -> Tuple[pd.DataFrame, str, Op
         if re.search(pattern, code, re.IGNORECASE):
             return df, "", f"There are dangerous operation in the code: {pattern}"
 
-    local_vars = {"df": df.copy()}
+    # Copy-on-Write 下浅拷贝即可，用户代码修改列时才会复制
+    local_vars = {"df": df.copy(deep=False)}
     
     output_buffer = io.StringIO()
     
@@ -251,14 +253,39 @@ def convert_csv_encoding(file_content: bytes, from_encoding: str, to_encoding: s
     except Exception as e:
         raise ValueError(f"编码转换失败: {e}")
 
-def detect_csv_encoding(file_content: bytes) -> str:
-    encodings_to_try = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig', 'cp936', 'latin1', 'iso-8859-1']
-    
-    for encoding in encodings_to_try:
+CSV_ENCODINGS = ['utf-8', 'gbk', 'gb18030', 'latin1']
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+def _decodes(sample: bytes, encoding: str, starts_file: bool, ends_file: bool) -> bool:
+    # 采样边界可能截断多字节字符：不在文件开头的样本跳过最多 3 个字节，不在文件结尾的样本容忍末尾残缺
+    for offset in ([0] if starts_file else range(4)):
         try:
-            file_content.decode(encoding)
-            return encoding
+            codecs.getincrementaldecoder(encoding)().decode(sample[offset:], final=ends_file)
+            return True
         except UnicodeDecodeError:
             continue
-    
-    return 'utf-8' 
\ No newline at end of file
+    return False
+
+def detect_csv_encoding(file_content: bytes, sample_bytes: Optional[int] = ENCODING_SAMPLE_BYTES) -> str:
+    """Pick the encoding from the head and tail of the file; sample_bytes=None checks the whole content"""
+    if file_content.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample_bytes is None or len(file_content) <= 2 * sample_bytes:
+        samples = [(file_content, True, True)]
+    else:
+        samples = [(file_content[:sample_bytes], True, False), (file_content[-sample_bytes:], False, True)]
+
+    for encoding in CSV_ENCODINGS:
+        if all(_decodes(sample, encoding, starts_file, ends_file) for sample, starts_file, ends_file in samples):
+            return encoding
+    return 'latin1'
+
+def read_csv_bytes(file_content: bytes, **kwargs) -> Tuple[pd.DataFrame, str]:
+    """Detect the encoding once from samples and parse once; re-detect on the whole file only if the sample was misleading"""
+    encoding = detect_csv_encoding(file_content)
+    try:
+        return pd.read_csv(io.BytesIO(file_content), encoding=encoding, **kwargs), encoding
+    except UnicodeDecodeError:
+        # 非 ASCII 字符只出现在文件中间时，采样会误判为 utf-8
+        encoding = detect_csv_encoding(file_content, sample_bytes=None)
+        return pd.read_csv(io.BytesIO(file_content), encoding=encoding, **kwargs), encoding 
\ No newline at end of file
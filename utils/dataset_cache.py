@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from utils.config import get_config
+from utils.dataset_store import HAS_ARROW, frame_buffers, to_arrow_backed
+
+SPILL_DIR = "dataset_cache"
+DEFAULT_MAX_MEMORY_MB = 1024
+DEFAULT_MAX_DISK_MB = 4096
+
+
+def dataset_key(data: bytes, options: Dict) -> str:
+    """Key a parsed upload by the SHA-256 of its bytes plus the options it was parsed with"""
+    digest = hashlib.sha256(data)
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return sum(frame_buffers(df).values())
+
+
+class DatasetCache:
+    """Process-wide LRU of parsed upload DataFrames shared by all sessions, spilling evicted frames to Parquet"""
+
+    def __init__(self, spill_dir: str = SPILL_DIR):
+        self.spill_dir = spill_dir
+        self.max_bytes = int(get_config("dataset_cache", "max_memory_mb", DEFAULT_MAX_MEMORY_MB)) * 1024 ** 2
+        self.max_disk_bytes = int(get_config("dataset_cache", "max_disk_mb", DEFAULT_MAX_DISK_MB)) * 1024 ** 2
+        self.lock = threading.Lock()
+        self.key_locks = {}
+        self.entries: "OrderedDict[str, Tuple[pd.DataFrame, Dict, int]]" = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.spill_dir, key)
+        return base + ".parquet", base + ".json"
+
+    def _get_memory(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def _load_spilled(self, key: str):
+        parquet_path, info_path = self._paths(key)
+        if not os.path.isfile(parquet_path):
+            return None
+        try:
+            df = pd.read_parquet(parquet_path)
+            with open(info_path, encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(parquet_path)
+        return df, info
+
+    def _spill(self, key: str, df: pd.DataFrame, info: Dict):
+        parquet_path, info_path = self._paths(key)
+        if not HAS_ARROW or os.path.isfile(parquet_path):
+            return
+        os.makedirs(self.spill_dir, exist_ok=True)
+        try:
+            df.to_parquet(parquet_path + ".tmp", index=False)
+            with open(info_path, "w", encoding="utf-8") as f:
+                json.dump(info, f)
+            os.replace(parquet_path + ".tmp", parquet_path)
+        except Exception:
+            # 混合类型的对象列等无法写成 Parquet，放弃落盘，下次重新解析
+            for path in (parquet_path + ".tmp", info_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        self._evict_disk(keep=key)
+
+    def _evict_disk(self, keep: str = None):
+        files = [
+            os.path.join(self.spill_dir, name) for name in os.listdir(self.spill_dir) if name.endswith(".parquet")
+        ]
+        files.sort(key=os.path.getmtime)
+        total = sum(os.path.getsize(path) for path in files)
+        for path in files:
+            if total <= self.max_disk_bytes:
+                break
+            key = os.path.basename(path)[:-len(".parquet")]
+            if key == keep:
+                continue
+            total -= os.path.getsize(path)
+            for spilled in self._paths(key):
+                if os.path.exists(spilled):
+                    os.remove(spilled)
+
+    def _remember(self, key: str, df: pd.DataFrame, info: Dict):
+        size = frame_bytes(df)
+        evicted = []
+        with self.lock:
+            self.entries[key] = (df, info, size)
+            self.memory_bytes += size
+            while self.memory_bytes > self.max_bytes and len(self.entries) > 1:
+                old_key, (old_df, old_info, old_size) = self.entries.popitem(last=False)
+                self.memory_bytes -= old_size
+                evicted.append((old_key, old_df, old_info))
+        # 落盘放在锁外，避免写 Parquet 时阻塞其他会话
+        for old_key, old_df, old_info in evicted:
+            self._spill(old_key, old_df, old_info)
+
+    def get_or_parse(self, data: bytes, options: Dict,
+                     parse_fn: Callable[[], Tuple[pd.DataFrame, Dict]]) -> Tuple[pd.DataFrame, Dict]:
+        """Return (df, info) for these bytes and options, parsing only if no session has done so before.
+
+        The returned DataFrame is shared: callers must treat it as read-only (Copy-on-Write takes care of
+        this for the Workspace, which only ever derives new frames from it).
+        """
+        key = dataset_key(data, options)
+        with self._key_lock(key):
+            entry = self._get_memory(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0], dict(entry[1], cache="memory")
+            spilled = self._load_spilled(key)
+            if spilled is not None:
+                self.disk_hits += 1
+                df, info = spilled
+                source = "disk"
+            else:
+                self.misses += 1
+                df, info = parse_fn()
+                df = to_arrow_backed(df)
+                source = "parsed"
+            self._remember(key, df, info)
+            return df, dict(info, cache=source)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "datasets": len(self.entries),
+                "memory_mb": round(self.memory_bytes / 1024 ** 2, 1),
+                "max_memory_mb": round(self.max_bytes / 1024 ** 2),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+
+_cache: Optional[DatasetCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_dataset_cache() -> DatasetCache:
+    """Process-wide dataset cache shared by every Workspace session"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DatasetCache()
+        return _cache
@@ -0,0 +1,95 @@
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.config import get_config
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+
+def enable_copy_on_write() -> None:
+    """Let derived DataFrames share unchanged columns until one side writes (always on from pandas 3.0)"""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return
+    try:
+        pd.set_option("mode.copy_on_write", True)
+    except (KeyError, pd.errors.OptionError):
+        # pandas < 1.5 没有 Copy-on-Write，退化为普通浅拷贝
+        pass
+
+
+def to_arrow_backed(df: pd.DataFrame) -> pd.DataFrame:
+    """Store text columns as Arrow strings: one contiguous buffer per column instead of a Python object per cell"""
+    if not HAS_ARROW or not get_config("workspace", "arrow_strings", True) or not df.columns.is_unique:
+        return df
+    string_columns = [
+        column for column in df.columns
+        if df[column].dtype == object and pd.api.types.infer_dtype(df[column], skipna=True) in ("string", "empty")
+    ]
+    if not string_columns:
+        return df
+    return df.astype({column: "string[pyarrow]" for column in string_columns})
+
+
+def _root(array: np.ndarray) -> np.ndarray:
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def _column_buffers(series: pd.Series) -> Iterator[Tuple[int, int]]:
+    """(address, bytes) of the memory behind one column, so buffers shared between frames count once"""
+    array = series.array
+    if HAS_ARROW and hasattr(array, "__arrow_array__"):
+        chunked = array.__arrow_array__()
+        for chunk in getattr(chunked, "chunks", [chunked]):
+            for buffer in chunk.buffers():
+                if buffer is not None:
+                    yield buffer.address, buffer.size
+        return
+    if hasattr(array, "_data") and hasattr(array, "_mask"):
+        # Int64 / boolean 等可空类型：数据和掩码是两个 numpy 数组
+        for part in (array._data, array._mask):
+            root = _root(part)
+            yield root.__array_interface__["data"][0], root.nbytes
+        return
+    values = series.to_numpy(copy=False)
+    if isinstance(values, np.ndarray):
+        root = _root(values)
+        address = root.__array_interface__["data"][0]
+        if values.dtype == object:
+            # 对象列的字符串不在数组缓冲区里，按列视图整体计数
+            yield values.__array_interface__["data"][0], int(series.memory_usage(deep=True, index=False))
+        else:
+            yield address, root.nbytes
+        return
+    yield id(array), int(array.nbytes)
+
+
+def frame_buffers(df: pd.DataFrame) -> Dict[int, int]:
+    buffers = {}
+    for _, series in df.items():
+        buffers.update(_column_buffers(series))
+    return buffers
+
+
+def memory_report(datasets: Dict[str, Dict]) -> Dict:
+    """Per-table raw/clean/shared bytes and the session total with shared buffers counted once"""
+    tables, session_buffers = [], {}
+    for name, dataset in datasets.items():
+        raw = frame_buffers(dataset["raw"]) if dataset.get("raw") is not None else {}
+        clean = frame_buffers(dataset["clean"]) if dataset.get("clean") is not None else {}
+        tables.append({
+            "Table": name,
+            "Raw MB": round(sum(raw.values()) / 1024 ** 2, 2),
+            "Clean MB": round(sum(clean.values()) / 1024 ** 2, 2),
+            "Shared MB": round(sum(size for address, size in clean.items() if address in raw) / 1024 ** 2, 2),
+        })
+        session_buffers.update(raw)
+        session_buffers.update(clean)
+    return {"tables": tables, "total_bytes": sum(session_buffers.values())}
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+import streamlit as st
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql import text
+
+from utils.config import get_config
+from utils.query_stats import caller, record_query
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_OVERFLOW = 20
+DEFAULT_POOL_TIMEOUT = 30
+DEFAULT_POOL_RECYCLE = 1800
+DEFAULT_STATEMENT_TIMEOUT_MS = 30000
+DEFAULT_WRITE_STATEMENT_TIMEOUT_MS = 1800000
+
+_stats_lock = threading.Lock()
+_checkout_waits = deque(maxlen=1000)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            with _stats_lock:
+                _checkout_waits.append(time.perf_counter() - start)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # conn.query、conn.session.execute、pandas.read_sql 最终都经过这里
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    record_query(statement, elapsed, cursor.rowcount, caller())
+
+
+def _handle_error(context):
+    # 失败或超时的语句不会触发 after_cursor_execute，在这里弹出起始时间并记为错误
+    conn = context.connection
+    if conn is None or context.statement is None or not conn.info.get("query_start"):
+        return
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    record_query(context.statement, elapsed, -1, caller(), error=True)
+
+
+def _instrument(engine):
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+def get_connection():
+    """Shared PostgreSQL connection for every page, with a tuned pool and a statement timeout"""
+    statement_timeout = int(get_config("database", "statement_timeout_ms", DEFAULT_STATEMENT_TIMEOUT_MS))
+    conn = st.connection(
+        "postgresql",
+        type="sql",
+        poolclass=TimedQueuePool,
+        pool_size=int(get_config("database", "pool_size", DEFAULT_POOL_SIZE)),
+        max_overflow=int(get_config("database", "max_overflow", DEFAULT_MAX_OVERFLOW)),
+        pool_timeout=int(get_config("database", "pool_timeout", DEFAULT_POOL_TIMEOUT)),
+        pool_recycle=int(get_config("database", "pool_recycle", DEFAULT_POOL_RECYCLE)),
+        # 连接被数据库或防火墙断开后自动重连，避免用到失效连接
+        pool_pre_ping=True,
+        connect_args={"options": f"-c statement_timeout={statement_timeout}"},
+    )
+    _instrument(conn.engine)
+    return conn
+
+
+def extend_statement_timeout(session) -> None:
+    """Raise the pool's statement_timeout for the rest of this transaction, for long Admin writes"""
+    timeout_ms = int(get_config("admin", "write_statement_timeout_ms", DEFAULT_WRITE_STATEMENT_TIMEOUT_MS))
+    # SET LOCAL 只作用于当前事务，提交或回滚后连接池中的连接恢复默认超时
+    session.execute(text(f"SET LOCAL statement_timeout = {timeout_ms}"))
+
+
+def quote_ident(name: str) -> str:
+    """Quote a table or column name for interpolation into SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def pool_stats() -> Dict:
+    """Pool occupancy plus checkout wait statistics in milliseconds"""
+    pool = get_connection().engine.pool
+    with _stats_lock:
+        waits = sorted(_checkout_waits)
+    return {
+        "pool_size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "idle": pool.checkedin(),
+        "checkouts": len(waits),
+        "avg_wait_ms": 1000 * sum(waits) / len(waits) if waits else 0.0,
+        "max_wait_ms": 1000 * waits[-1] if waits else 0.0,
+    }
+
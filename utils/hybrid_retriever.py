@@ -0,0 +1,147 @@
+import math
+import re
+import threading
+import weakref
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from utils.config import get_config
+
+DEFAULT_K = 4
+DEFAULT_FETCH_K = 20
+DEFAULT_ALPHA = 0.5
+
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens; codes like E-1043 or PN-4432.A also yield their parts"""
+    tokens = []
+    for match in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(match)
+        # 错误码、零件号既保留整体也拆分，用户只输入一部分时也能命中
+        parts = re.split(r"[-./]", match)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    return tokens
+
+
+class BM25Index:
+    """In-memory inverted index scored with Okapi BM25"""
+
+    def __init__(self, texts: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths = np.zeros(len(texts), dtype=np.float32)
+        for doc_idx, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_lengths[doc_idx] = sum(counts.values())
+            for term, tf in counts.items():
+                self.postings[term].append((doc_idx, tf))
+        self.doc_count = len(texts)
+        self.avg_length = float(self.doc_lengths.mean()) if self.doc_count else 0.0
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        """Top-k (doc_idx, score) pairs; only documents sharing a term with the query are scored"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            for doc_idx, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_idx] / self.avg_length)
+                scores[doc_idx] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+def _normalize(scores: Dict[int, float]) -> Dict[int, float]:
+    if not scores:
+        return {}
+    low, high = min(scores.values()), max(scores.values())
+    if high == low:
+        return {i: 1.0 for i in scores}
+    return {i: (s - low) / (high - low) for i, s in scores.items()}
+
+
+def _faiss_texts(vectorstore) -> List[str]:
+    return [
+        vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+        for i in range(len(vectorstore.index_to_docstore_id))
+    ]
+
+
+def dense_search(vectorstore, query: str, k: int) -> Dict[int, float]:
+    """FAISS search returning {position: similarity} where larger is better"""
+    from langchain_community.vectorstores.utils import DistanceStrategy
+
+    embedding = np.array([vectorstore._embed_query(query)], dtype=np.float32)
+    if vectorstore._normalize_L2:
+        embedding /= np.linalg.norm(embedding, axis=1, keepdims=True)
+    scores, indices = vectorstore.index.search(embedding, k)
+    inner_product = vectorstore.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT
+    stale = getattr(vectorstore, "stale_positions", ())
+    return {
+        int(i): float(s) if inner_product else -float(s)
+        for s, i in zip(scores[0], indices[0]) if i != -1 and i not in stale
+    }
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuse BM25 keyword scores with FAISS vector scores over the same documents"""
+
+    vectorstore: Any
+    bm25: Any
+    k: int = DEFAULT_K
+    fetch_k: int = DEFAULT_FETCH_K
+    # 向量得分权重，1 为纯向量检索，0 为纯 BM25
+    alpha: float = DEFAULT_ALPHA
+
+    def fused_scores(self, query: str) -> List[Tuple[int, float]]:
+        dense = _normalize(dense_search(self.vectorstore, query, self.fetch_k))
+        # 知识库增量同步后，被替换或删除的块仍留在索引中，检索时跳过
+        stale = getattr(self.vectorstore, "stale_positions", ())
+        sparse = _normalize({i: s for i, s in self.bm25.search(query, self.fetch_k) if i not in stale})
+        fused = {
+            i: self.alpha * dense.get(i, 0.0) + (1 - self.alpha) * sparse.get(i, 0.0)
+            for i in set(dense) | set(sparse)
+        }
+        return sorted(fused.items(), key=lambda item: item[1], reverse=True)[:self.k]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = []
+        for position, score in self.fused_scores(query):
+            doc = self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[position])
+            docs.append(Document(page_content=doc.page_content, metadata={**doc.metadata, "hybrid_score": score}))
+        return docs
+
+
+# 每个已发布的 FAISS 索引只建一次倒排索引；索引对象被回收时缓存随之释放
+_bm25_cache = weakref.WeakKeyDictionary()
+_bm25_lock = threading.Lock()
+
+
+def get_bm25_index(vectorstore) -> BM25Index:
+    with _bm25_lock:
+        bm25 = _bm25_cache.get(vectorstore)
+        if bm25 is None or bm25.doc_count != len(vectorstore.index_to_docstore_id):
+            bm25 = BM25Index(_faiss_texts(vectorstore))
+            _bm25_cache[vectorstore] = bm25
+        return bm25
+
+
+def get_hybrid_retriever(vectorstore, k: int = None, fetch_k: int = None, alpha: float = None) -> HybridRetriever:
+    return HybridRetriever(
+        vectorstore=vectorstore,
+        bm25=get_bm25_index(vectorstore),
+        k=k or int(get_config("retrieval", "k", DEFAULT_K)),
+        fetch_k=fetch_k or int(get_config("retrieval", "fetch_k", DEFAULT_FETCH_K)),
+        alpha=float(get_config("retrieval", "alpha", DEFAULT_ALPHA)) if alpha is None else alpha,
+    )
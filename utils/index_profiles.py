@@ -0,0 +1,104 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+from utils.config import get_config
+
+PROFILES = ("flat", "hnsw", "ivfpq")
+DEFAULT_HNSW_MIN_VECTORS = 50_000
+DEFAULT_IVFPQ_MIN_VECTORS = 1_000_000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 16
+PQ_BITS = 8
+MAX_TRAIN_VECTORS = 100_000
+
+
+def choose_profile(vector_count: int) -> str:
+    """Profile from [vector_index] profile, or picked from the vector count when set to auto"""
+    profile = str(get_config("vector_index", "profile", "auto")).lower()
+    if profile not in PROFILES:
+        hnsw_min = int(get_config("vector_index", "hnsw_min_vectors", DEFAULT_HNSW_MIN_VECTORS))
+        ivfpq_min = int(get_config("vector_index", "ivfpq_min_vectors", DEFAULT_IVFPQ_MIN_VECTORS))
+        if vector_count >= ivfpq_min:
+            profile = "ivfpq"
+        elif vector_count >= hnsw_min:
+            profile = "hnsw"
+        else:
+            profile = "flat"
+    return profile
+
+
+def profile_of(index) -> str:
+    import faiss
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
+
+
+def _pq_subquantizers(dim: int) -> int:
+    # 每个子量化器约 8 维，且必须整除向量维度
+    for m in range(max(1, dim // 8), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def create_index(profile: str, dim: int, train_vectors: Optional[np.ndarray] = None):
+    """Empty FAISS index for a profile; IVF-PQ is trained on train_vectors"""
+    import faiss
+    if profile == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif profile == "ivfpq":
+        if train_vectors is None or len(train_vectors) == 0:
+            raise ValueError("IVF-PQ needs training vectors")
+        nlist = max(1, min(int(4 * math.sqrt(len(train_vectors))), len(train_vectors) // 39 or 1))
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, _pq_subquantizers(dim), PQ_BITS)
+        index.train(np.ascontiguousarray(train_vectors, dtype=np.float32))
+    else:
+        index = faiss.IndexFlatL2(dim)
+    configure_search(index)
+    return index
+
+
+def configure_search(index):
+    """Search-time parameters, which are not all restored by faiss.read_index"""
+    import faiss
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = int(get_config("vector_index", "hnsw_ef_search", HNSW_EF_SEARCH))
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = int(get_config("vector_index", "ivf_nprobe", IVF_NPROBE))
+    return index
+
+
+def apply_profile(db):
+    """Rebuild a LangChain FAISS store's index with the profile suited to its size; positions stay the same.
+
+    HNSW cannot remove vectors and IVF keeps stale positions after removal, so
+    only apply this to stores that are not deleted from afterwards.
+    """
+    if db is None or db.index.ntotal == 0:
+        return db
+    index = db.index
+    profile = choose_profile(index.ntotal)
+    if profile == profile_of(index):
+        configure_search(index)
+        return db
+    if profile_of(index) == "ivfpq":
+        index.make_direct_map()
+    vectors = index.reconstruct_n(0, index.ntotal)
+    train = None
+    if profile == "ivfpq":
+        rng = np.random.default_rng(0)
+        sample = rng.choice(len(vectors), size=min(len(vectors), MAX_TRAIN_VECTORS), replace=False)
+        train = vectors[sample]
+    new_index = create_index(profile, index.d, train)
+    new_index.add(vectors)
+    db.index = new_index
+    return db
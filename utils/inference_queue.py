@@ -0,0 +1,127 @@
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from utils.config import get_config
+
+DEFAULT_MAX_WORKERS = 1
+DEFAULT_MAX_QUEUED = 8
+FINISHED_JOB_TTL_SECONDS = 600
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class InferenceJob:
+    """One queued LLM request; text holds the partial answer while it streams"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.text = ""
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def set_text(self, text: str):
+        self.text = text
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "error")
+
+    @property
+    def wait_time(self) -> float:
+        return (self.started_at or time.time()) - self.submitted_at
+
+
+class InferenceQueue:
+    """Bounded worker pool for LLM generation so the Streamlit script thread never blocks on the model"""
+
+    def __init__(self, max_workers: int = None, max_queued: int = None):
+        # 模型在本进程内共享（见 model_registry），因此用线程池而不是进程池；llama.cpp 推理时会释放 GIL
+        self.max_workers = max_workers or int(get_config("inference_queue", "max_workers", DEFAULT_MAX_WORKERS))
+        self.max_queued = max_queued or int(get_config("inference_queue", "max_queued", DEFAULT_MAX_QUEUED))
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+        self.lock = threading.Lock()
+        self.jobs: Dict[str, InferenceJob] = {}
+        self.wait_times = deque(maxlen=200)
+        self.completed = 0
+        self.failed = 0
+
+    def _prune(self, now: float):
+        for job_id in [j.id for j in self.jobs.values() if j.finished and now - j.finished_at > FINISHED_JOB_TTL_SECONDS]:
+            del self.jobs[job_id]
+
+    def position(self, job_id: str) -> int:
+        """1-based place in the queue, 0 once the job is running or finished"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != "queued":
+                return 0
+            return 1 + sum(1 for j in self.jobs.values() if j.status == "queued" and j.submitted_at < job.submitted_at)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> InferenceJob:
+        """Queue fn(job, *args, **kwargs); its return value becomes job.result"""
+        with self.lock:
+            self._prune(time.time())
+            if sum(1 for j in self.jobs.values() if j.status == "queued") >= self.max_queued:
+                raise QueueFullError(f"{self.max_queued} requests are already waiting, please try again shortly")
+            job = InferenceJob()
+            self.jobs[job.id] = job
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: InferenceJob, fn: Callable, args, kwargs):
+        job.started_at = time.time()
+        job.status = "running"
+        with self.lock:
+            self.wait_times.append(job.wait_time)
+        try:
+            job.result = fn(job, *args, **kwargs)
+            status = "done"
+        except Exception as e:
+            job.error = str(e)
+            status = "error"
+        # finished_at 必须先于 status 设置且在锁内，否则 _prune 可能看到已结束但没有结束时间的任务
+        with self.lock:
+            job.finished_at = time.time()
+            job.status = status
+            if status == "done":
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def get(self, job_id: str) -> Optional[InferenceJob]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            waits = sorted(self.wait_times)
+            return {
+                "queued": sum(1 for j in self.jobs.values() if j.status == "queued"),
+                "running": sum(1 for j in self.jobs.values() if j.status == "running"),
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+                "p95_wait": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+            }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_inference_queue() -> InferenceQueue:
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = InferenceQueue()
+        return _queue
@@ -0,0 +1,118 @@
+import csv
+import io
+import os
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.vectorstores import FAISS
+
+from utils.config import get_config
+from utils.index_profiles import apply_profile
+
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHUNK_OVERLAP = 100
+DEFAULT_EMBED_BATCH_SIZE = 64
+
+_torch_threads_set = False
+
+
+def _configure_torch_threads():
+    global _torch_threads_set
+    if _torch_threads_set:
+        return
+    threads = int(get_config("ingestion", "torch_threads", 0))
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+    _torch_threads_set = True
+
+
+def _size_of(file) -> int:
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+
+def iter_csv_documents(file, source: str, encoding: str = "utf-8-sig", delimiter: str = ",",
+                       progress: Optional[Callable[[float], None]] = None) -> Iterator[Document]:
+    """One document per CSV row formatted like CSVLoader, reading the file as a stream"""
+    total = _size_of(file) or 1
+    text_stream = io.TextIOWrapper(file, encoding=encoding, errors="replace", newline="")
+    try:
+        reader = csv.DictReader(text_stream, delimiter=delimiter)
+        for row_number, row in enumerate(reader):
+            content = "\n".join(f"{str(k).strip()}: {str(v).strip() if v is not None else ''}" for k, v in row.items())
+            yield Document(page_content=content, metadata={"source": source, "row": row_number})
+            if progress and row_number % 1000 == 0:
+                progress(file.tell() / total)
+    finally:
+        text_stream.detach()
+
+
+def iter_pdf_documents(file, source: str, progress: Optional[Callable[[float], None]] = None) -> Iterator[Document]:
+    """One document per PDF page"""
+    from pypdf import PdfReader
+    reader = PdfReader(file)
+    page_count = len(reader.pages) or 1
+    for page_number, page in enumerate(reader.pages):
+        text = page.extract_text() or ""
+        if text.strip():
+            yield Document(page_content=text, metadata={"source": source, "page": page_number})
+        if progress:
+            progress((page_number + 1) / page_count)
+
+
+def iter_file_documents(file, filename: str, progress: Optional[Callable[[float], None]] = None) -> Iterator[Document]:
+    """Pick the loader from the file extension"""
+    if filename.lower().endswith(".pdf"):
+        return iter_pdf_documents(file, filename, progress)
+    return iter_csv_documents(file, filename, progress=progress)
+
+
+def chunk_documents(documents: Iterable[Document], chunk_size: int = None, chunk_overlap: int = None) -> Iterator[Document]:
+    """Split each document into overlapping chunks as it arrives"""
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size or int(get_config("ingestion", "chunk_size", DEFAULT_CHUNK_SIZE)),
+        chunk_overlap=chunk_overlap or int(get_config("ingestion", "chunk_overlap", DEFAULT_CHUNK_OVERLAP)),
+    )
+    for document in documents:
+        yield from splitter.split_documents([document])
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def append_documents(db: Optional[FAISS], documents: List[Document], embeddings, ids: List[str] = None) -> FAISS:
+    """Embed one batch and append it to the index, creating the index for the first batch"""
+    _configure_torch_threads()
+    texts = [d.page_content for d in documents]
+    metadatas = [d.metadata for d in documents]
+    vectors = embeddings.embed_documents(texts)
+    if db is None:
+        return FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas, ids=ids)
+    db.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+    return db
+
+
+def ingest(documents: Iterable[Document], embeddings, db: Optional[FAISS] = None, batch_size: int = None,
+           progress: Optional[Callable[[Dict], None]] = None) -> Optional[FAISS]:
+    """load -> chunk -> batch embed -> append; only one batch of chunks is held in memory at a time"""
+    batch_size = batch_size or int(get_config("ingestion", "embed_batch_size", DEFAULT_EMBED_BATCH_SIZE))
+    chunks = 0
+    for batch in _batches(chunk_documents(documents), batch_size):
+        db = append_documents(db, batch, embeddings)
+        chunks += len(batch)
+        if progress:
+            progress({"chunks": chunks})
+    # 全部写入后按向量数量选择 Flat / HNSW / IVF-PQ
+    return apply_profile(db)
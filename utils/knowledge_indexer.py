@@ -0,0 +1,280 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.sql import text
+from langchain.docstore.document import Document
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.vectorstores import FAISS
+
+from utils.config import get_config
+from utils.ingestion import append_documents, chunk_documents
+from utils.index_profiles import apply_profile, choose_profile, configure_search, profile_of
+from utils.model_registry import get_embeddings
+
+INDEX_PATH = "vectorstore/db_faiss"
+MANIFEST_FILE = "manifest.json"
+DEFAULT_INTERVAL_SECONDS = 300
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_REBUILD_STALE_FRACTION = 0.2
+# 向量 id 为 knowlid:partnum:chunk，manifest 中的 id 方案不同时全量重建
+ID_SCHEME = "knowlid:partnum:chunk"
+
+_sync_lock = threading.Lock()
+_state_lock = threading.Lock()
+_wake = threading.Event()
+_writer_db: Optional[FAISS] = None
+_reader_db: Optional[FAISS] = None
+_worker: Optional[threading.Thread] = None
+_status = {
+    "index_version": 0,
+    "documents": 0,
+    "chunks": 0,
+    "last_sync": None,
+    "last_duration": None,
+    "last_changed": 0,
+    "last_error": None,
+}
+
+
+def part_id(knowlid, partnum) -> str:
+    """Id prefix shared by the chunks of one knowledgecontents row"""
+    return f"{int(knowlid)}:{int(partnum)}"
+
+
+def _manifest_path() -> str:
+    return os.path.join(INDEX_PATH, MANIFEST_FILE)
+
+
+def _load_manifest() -> Dict:
+    try:
+        with open(_manifest_path(), encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("id_scheme") == ID_SCHEME:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    # 没有 manifest 或 id 方案不同的旧索引无法映射回数据库行，需要全量重建
+    return {"index_version": 0, "id_scheme": ID_SCHEME, "versions": {}, "parts": {}}
+
+
+def _save_manifest(manifest: Dict):
+    tmp = _manifest_path() + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, _manifest_path())
+
+
+def _load_writer(manifest: Dict, embeddings) -> Optional[FAISS]:
+    global _writer_db
+    if _writer_db is None and manifest["versions"] and os.path.isfile(os.path.join(INDEX_PATH, "index.faiss")):
+        _writer_db = FAISS.load_local(INDEX_PATH, embeddings, allow_dangerous_deserialization=True)
+    return _writer_db
+
+
+def _fetch_parts(engine, knowlids: List[int]) -> pd.DataFrame:
+    query = text("""
+        SELECT c.knowlid, c.partnum, c.title, c.content, o.knowltitle, o.typeid, o.versionnum
+        FROM knowledgecontents c
+        JOIN knowledgeoverviews o ON o.knowlid = c.knowlid
+        WHERE c.knowlid = ANY(:ids)
+        ORDER BY c.knowlid, c.partnum
+    """)
+    with engine.connect() as connection:
+        return pd.read_sql(query, connection, params={"ids": knowlids})
+
+
+def parts_to_documents(parts: pd.DataFrame):
+    docs, ids = [], []
+    for row in parts.itertuples(index=False):
+        body = "\n".join(str(v) for v in (row.knowltitle, row.title, row.content) if pd.notna(v) and v != "")
+        docs.append(Document(
+            page_content=body,
+            metadata={
+                "knowlid": int(row.knowlid),
+                "partnum": int(row.partnum),
+                "typeid": None if pd.isna(row.typeid) else int(row.typeid),
+                "versionnum": None if pd.isna(row.versionnum) else int(row.versionnum),
+                "title": row.title,
+            }
+        ))
+        ids.append(part_id(row.knowlid, row.partnum))
+    return docs, ids
+
+
+def chunk_parts(docs: List[Document]):
+    """Split part documents with the ingestion splitter and give each chunk a knowlid:partnum:chunk id"""
+    chunks, ids, counts = [], [], {}
+    for chunk in chunk_documents(docs):
+        pid = part_id(chunk.metadata["knowlid"], chunk.metadata["partnum"])
+        ids.append(f"{pid}:{counts.get(pid, 0)}")
+        counts[pid] = counts.get(pid, 0) + 1
+        chunks.append(chunk)
+    return chunks, ids
+
+
+def _load_reader(manifest: Dict, embeddings) -> Optional[FAISS]:
+    if manifest["versions"] and os.path.isfile(os.path.join(INDEX_PATH, "index.faiss")):
+        return apply_profile(FAISS.load_local(INDEX_PATH, embeddings, allow_dangerous_deserialization=True))
+    return None
+
+
+def _extend_reader(reader: Optional[FAISS], writer: Optional[FAISS], added_ids: List[str],
+                   stale_ids: List[str]) -> Optional[FAISS]:
+    """Copy of the published HNSW / IVF-PQ reader with new chunks added and stale ones tombstoned.
+
+    Returns None when a full rebuild is due: the reader is Flat (cheap to reload), the corpus moved
+    to another profile, or tombstones exceed rebuild_stale_fraction of the index.
+    """
+    if reader is None or writer is None or profile_of(reader.index) == "flat":
+        return None
+    import faiss
+
+    # 同一 id 可能对应多个位置（旧位置已是墓碑），取最新的位置
+    positions = {doc_id: pos for pos, doc_id in sorted(reader.index_to_docstore_id.items())}
+    stale = set(getattr(reader, "stale_positions", ())) | {positions[i] for i in stale_ids if i in positions}
+    total = reader.index.ntotal + len(added_ids)
+    fraction = float(get_config("knowledge_indexer", "rebuild_stale_fraction", DEFAULT_REBUILD_STALE_FRACTION))
+    if choose_profile(total - len(stale)) != profile_of(reader.index) or len(stale) > total * fraction:
+        return None
+
+    # 新向量直接从 Flat 写入端取回，不重新 embedding；HNSW 增量插入、IVF-PQ 用已训练的量化器编码
+    index = configure_search(faiss.clone_index(reader.index))
+    mapping = dict(reader.index_to_docstore_id)
+    documents = dict(reader.docstore._dict)
+    if added_ids:
+        writer_positions = {doc_id: pos for pos, doc_id in writer.index_to_docstore_id.items()}
+        vectors = np.vstack([writer.index.reconstruct(writer_positions[i]) for i in added_ids])
+        index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        for offset, doc_id in enumerate(added_ids):
+            mapping[reader.index.ntotal + offset] = doc_id
+            documents[doc_id] = writer.docstore.search(doc_id)
+
+    extended = FAISS(
+        reader.embedding_function, index, InMemoryDocstore(documents), mapping,
+        normalize_L2=reader._normalize_L2, distance_strategy=reader.distance_strategy,
+    )
+    # HNSW 无法删除向量，被替换或删除的块在检索时由 HybridRetriever 跳过
+    extended.stale_positions = frozenset(stale)
+    return extended
+
+
+def sync_index(engine, embeddings=None) -> Dict:
+    """Embed only knowledge documents whose versionnum changed since the last sync"""
+    global _writer_db, _reader_db
+    embeddings = embeddings or get_embeddings()
+    batch_size = int(get_config("knowledge_indexer", "batch_size", DEFAULT_BATCH_SIZE))
+
+    with _sync_lock:
+        start = time.perf_counter()
+        manifest = _load_manifest()
+        with engine.connect() as connection:
+            overviews = pd.read_sql(text("SELECT knowlid, versionnum FROM knowledgeoverviews"), connection)
+        current = {
+            str(int(k)): (None if pd.isna(v) else int(v))
+            for k, v in zip(overviews["knowlid"], overviews["versionnum"])
+        }
+        known = manifest["versions"]
+        changed = [k for k, v in current.items() if k not in known or known[k] != v]
+        removed = [k for k in known if k not in current]
+        stale_ids, added_ids = [], []
+
+        if changed or removed:
+            try:
+                db = _load_writer(manifest, embeddings)
+                stale_ids = [pid for k in changed + removed for pid in manifest["parts"].get(k, [])]
+                if db is not None and stale_ids:
+                    # save_local 中途失败时磁盘索引可能已缺少部分 id，只删除实际存在的
+                    present = set(db.index_to_docstore_id.values())
+                    stale_ids = [pid for pid in stale_ids if pid in present]
+                    if stale_ids:
+                        db.delete(stale_ids)
+                for k in removed:
+                    known.pop(k, None)
+                    manifest["parts"].pop(k, None)
+
+                for i in range(0, len(changed), batch_size):
+                    batch = changed[i:i + batch_size]
+                    docs, _ = parts_to_documents(_fetch_parts(engine, [int(k) for k in batch]))
+                    docs, ids = chunk_parts(docs)
+                    if docs:
+                        db = append_documents(db, docs, embeddings, ids=ids)
+                        added_ids.extend(ids)
+                    for k in batch:
+                        known[k] = current[k]
+                        manifest["parts"][k] = [pid for pid in ids if pid.split(":")[0] == k]
+
+                if db is not None:
+                    db.save_local(INDEX_PATH)
+                manifest["index_version"] = manifest.get("index_version", 0) + 1
+                _save_manifest(manifest)
+            except Exception:
+                # 写入端已被原地修改但 manifest 未保存，丢弃它，下次从磁盘重新加载以与 manifest 保持一致
+                _writer_db = None
+                raise
+            _writer_db = db
+
+        # 读者使用独立的副本，写入中的索引不会被检索线程看到
+        # 写入端保持 Flat 以支持按 id 删除，只对只读副本按规模换成 HNSW / IVF-PQ
+        # 增量同步只把新块加入已发布的副本，墓碑过多或规模跨档时才从磁盘全量重建
+        reader = _reader_db
+        if changed or removed or _reader_db is None:
+            reader = _extend_reader(_reader_db, _writer_db, added_ids, stale_ids) if _reader_db is not None else None
+            if reader is None:
+                reader = _load_reader(manifest, embeddings)
+
+        with _state_lock:
+            _reader_db = reader
+            _status.update({
+                "index_version": manifest.get("index_version", 0),
+                "documents": len(manifest["versions"]),
+                "chunks": sum(len(p) for p in manifest["parts"].values()),
+                "last_sync": time.time(),
+                "last_duration": time.perf_counter() - start,
+                "last_changed": len(changed) + len(removed),
+                "last_error": None,
+            })
+        return get_index_status()
+
+
+def get_index() -> Optional[FAISS]:
+    """Latest published knowledge base index, or None before the first sync"""
+    with _state_lock:
+        return _reader_db
+
+
+def get_index_status() -> Dict:
+    with _state_lock:
+        return dict(_status)
+
+
+def request_sync():
+    """Wake the background indexer so recent edits are embedded without waiting for the interval"""
+    _wake.set()
+
+
+def _run(engine):
+    interval = float(get_config("knowledge_indexer", "interval_seconds", DEFAULT_INTERVAL_SECONDS))
+    while True:
+        try:
+            sync_index(engine)
+        except Exception as e:
+            with _state_lock:
+                _status["last_error"] = str(e)
+        _wake.wait(interval)
+        _wake.clear()
+
+
+def start_indexer(engine) -> bool:
+    """Start the background sync thread once per process"""
+    global _worker
+    with _state_lock:
+        if _worker is not None and _worker.is_alive():
+            return False
+        _worker = threading.Thread(target=_run, args=(engine,), name="knowledge-indexer", daemon=True)
+        _worker.start()
+    return True
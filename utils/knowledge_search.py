@@ -0,0 +1,55 @@
+from typing import Dict
+
+SEARCH_PAGE_SIZE = 10
+MAX_CONTENT_MATCHES = 1000
+
+# 依赖 set_database.txt 中的 searchvector 列与 GIN 索引；只对当前页生成摘要
+SEARCH_QUERY = """
+WITH q AS (
+    SELECT websearch_to_tsquery('english', :search_query) AS query
+),
+title_matches AS (
+    SELECT o.knowlid, NULL::INTEGER AS partnum, ts_rank(o.searchvector, q.query) AS rank
+    FROM knowledgeoverviews o, q
+    WHERE o.searchvector @@ q.query
+),
+content_matches AS (
+    -- 按相关度取前 N 条内容匹配（多取一条用于判断是否截断），排序与计数只在这些行上进行
+    SELECT c.knowlid, c.partnum, ts_rank(c.searchvector, q.query) AS rank
+    FROM knowledgecontents c, q
+    WHERE c.searchvector @@ q.query
+    ORDER BY rank DESC, c.knowlid, c.partnum
+    LIMIT :max_matches + 1
+),
+best AS (
+    SELECT DISTINCT ON (knowlid) knowlid, partnum, rank
+    FROM (SELECT * FROM title_matches UNION ALL SELECT * FROM content_matches) m
+    ORDER BY knowlid, rank DESC
+),
+page AS (
+    SELECT knowlid, partnum, rank, COUNT(*) OVER () AS total,
+        (SELECT COUNT(*) FROM content_matches) > :max_matches AS capped
+    FROM best
+    ORDER BY rank DESC, knowlid
+    LIMIT :limit OFFSET :offset
+)
+SELECT p.knowlid, o.knowltitle, o.versionnum, p.partnum, p.rank, p.total, p.capped,
+    ts_headline('english', COALESCE(c.content, o.knowltitle, ''), q.query,
+                'StartSel=**, StopSel=**, MaxFragments=2, MaxWords=30, MinWords=10') AS snippet
+FROM page p
+JOIN knowledgeoverviews o ON o.knowlid = p.knowlid
+LEFT JOIN knowledgecontents c ON c.knowlid = p.knowlid AND c.partnum = p.partnum
+CROSS JOIN q
+ORDER BY p.rank DESC, p.knowlid
+"""
+
+
+def search_params(search_query: str, page: int = 0, page_size: int = SEARCH_PAGE_SIZE,
+                  max_matches: int = MAX_CONTENT_MATCHES) -> Dict:
+    """Bind parameters for SEARCH_QUERY.
+
+    Every title match is ranked; content matches are ranked too, but only the max_matches best
+    are deduplicated and counted, so capped is true when more content parts matched.
+    """
+    return {"search_query": search_query, "limit": page_size, "offset": page * page_size,
+            "max_matches": max_matches}
@@ -0,0 +1,54 @@
+import time
+from typing import Callable, Dict, Optional
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+
+class TokenStreamHandler(BaseCallbackHandler):
+    """Collect streamed LLM tokens and time-to-first-token / tokens-per-second"""
+
+    def __init__(self, on_token: Optional[Callable[[str], None]] = None, skip_generations: int = 0):
+        self.on_token = on_token
+        # ConversationalRetrievalChain 有历史记录时会先调用一次 LLM 改写问题，这部分输出不展示
+        self.skip_generations = skip_generations
+        self.generations = 0
+        self.prompts = []
+        self.text = ""
+        self.tokens = 0
+        self.start_time = time.perf_counter()
+        self.first_token_time = None
+        self.last_token_time = None
+
+    def _streaming(self) -> bool:
+        return self.generations > self.skip_generations
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.generations += 1
+        self.prompts.extend(prompts)
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if not self._streaming():
+            return
+        now = time.perf_counter()
+        if self.first_token_time is None:
+            self.first_token_time = now
+        self.last_token_time = now
+        self.tokens += 1
+        self.text += token
+        if self.on_token:
+            self.on_token(self.text)
+
+    def metrics(self) -> Dict:
+        ttft = None
+        tokens_per_sec = None
+        if self.first_token_time is not None:
+            ttft = self.first_token_time - self.start_time
+            elapsed = self.last_token_time - self.first_token_time
+            if self.tokens > 1 and elapsed > 0:
+                tokens_per_sec = (self.tokens - 1) / elapsed
+        return {
+            "time_to_first_token": ttft,
+            "tokens": self.tokens,
+            "tokens_per_sec": tokens_per_sec,
+            "total_time": time.perf_counter() - self.start_time,
+        }
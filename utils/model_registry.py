@@ -0,0 +1,84 @@
+import threading
+import time
+from typing import Dict
+
+from utils.config import get_config
+
+LLM_MODEL_PATH = "./models/TheBloke/llama-2-7b-chat.Q4_K_M.gguf"
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+# 模型在整个服务进程内只加载一次，所有会话共享
+_models = {}
+_load_locks = {"llm": threading.Lock(), "embeddings": threading.Lock()}
+_load_times: Dict[str, float] = {}
+_warm_up_started = False
+_warm_up_lock = threading.Lock()
+
+# llama.cpp 的同一个实例不能并发生成，调用方需持有此锁
+generation_lock = threading.Lock()
+
+
+def _load(name: str, factory):
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _load_locks[name]:
+        if name not in _models:
+            start = time.perf_counter()
+            _models[name] = factory()
+            _load_times[name] = time.perf_counter() - start
+        return _models[name]
+
+
+def _create_llm():
+    from langchain_community.llms import LlamaCpp
+    return LlamaCpp(
+        model_path=get_config("models", "llm_path", LLM_MODEL_PATH),
+        n_ctx=2048,  # Context window
+        n_batch=512,  # Batch size
+        temperature=0.7,
+        top_p=1,
+        streaming=True,  # 通过回调逐 token 输出
+        verbose=True,
+    )
+
+
+def _create_embeddings():
+    from langchain.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=get_config("models", "embedding_model", EMBEDDING_MODEL_NAME),
+        model_kwargs={'device': 'cpu'}
+    )
+
+
+def get_llm():
+    """Shared LlamaCpp instance; wrap generation in generation_lock"""
+    return _load("llm", _create_llm)
+
+
+def get_embeddings():
+    """Shared HuggingFace sentence embedding model"""
+    return _load("embeddings", _create_embeddings)
+
+
+def get_load_times() -> Dict[str, float]:
+    """Seconds each model took to load in this process"""
+    return dict(_load_times)
+
+
+def warm_up():
+    get_embeddings()
+    get_llm()
+
+
+def start_warm_up() -> bool:
+    """Load the models in a background thread once per process if [models] warmup is enabled"""
+    global _warm_up_started
+    if not get_config("models", "warmup", False):
+        return False
+    with _warm_up_lock:
+        if _warm_up_started:
+            return False
+        _warm_up_started = True
+    threading.Thread(target=warm_up, name="model-warm-up", daemon=True).start()
+    return True
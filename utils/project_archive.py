@@ -0,0 +1,31 @@
+from typing import Dict, List
+
+from sqlalchemy.sql import column, insert, table
+
+projectsoverviews = table(
+    "projectsoverviews",
+    column("projid"), column("knowlid"), column("projtitle"),
+    column("begintime"), column("predictfinishtime"), column("actualfinishtime")
+)
+projectscontents = table(
+    "projectscontents",
+    column("projid"), column("step"), column("title"), column("userid"), column("begintime"),
+    column("predictfinishtime"), column("actualfinishtime"), column("completionrate"), column("remark")
+)
+
+
+def archive_project(session, overview: Dict, content_rows: List[Dict]) -> int:
+    """Insert the overview and all steps in one transaction with a single commit, returning the new projid"""
+    try:
+        # projid 由数据库的 identity 列分配，RETURNING 省去 MAX(projid) 查询且并发安全
+        projid = session.execute(
+            insert(projectsoverviews).values(**overview).returning(projectsoverviews.c.projid)
+        ).scalar_one()
+        if content_rows:
+            # executemany 由 SQLAlchemy 合并为多行 INSERT ... VALUES，而不是逐行往返
+            session.execute(insert(projectscontents), [{**row, "projid": projid} for row in content_rows])
+        session.commit()
+        return projid
+    except Exception:
+        session.rollback()
+        raise
@@ -0,0 +1,122 @@
+import heapq
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLES_PER_FINGERPRINT = 500
+SLOWEST_QUERIES = 100
+RECENT_QUERIES = 1000
+
+_lock = threading.Lock()
+_by_fingerprint: Dict[str, Dict] = {}
+_slowest: List = []
+_recent = deque(maxlen=RECENT_QUERIES)
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES = re.compile(r"(values\s*\(\?\))(?:\s*,\s*\(\?\))+")
+
+
+def fingerprint(statement: str) -> str:
+    """SQL with literals and bind parameters replaced by ?, so the same query shape groups together"""
+    sql = _COMMENTS.sub(" ", statement)
+    sql = _STRINGS.sub("?", sql)
+    sql = _PLACEHOLDERS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = " ".join(sql.split()).lower()
+    sql = _LISTS.sub("(?)", sql)
+    # 多行 VALUES 批量插入合并为同一指纹
+    return _VALUES.sub(r"\1, ...", sql)
+
+
+def caller() -> str:
+    """First function on the stack that belongs to this project, outside the instrumentation itself"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if (filename.startswith(PROJECT_ROOT) and "site-packages" not in filename
+                and not filename.endswith(("query_stats.py", os.path.join("utils", "db.py")))):
+            module = os.path.relpath(filename, PROJECT_ROOT)
+            return f"{module}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+def record_query(statement: str, seconds: float, rowcount: int, where: str, error: bool = False):
+    key = fingerprint(statement)
+    now = time.time()
+    with _lock:
+        stats = _by_fingerprint.get(key)
+        if stats is None:
+            stats = _by_fingerprint[key] = {
+                "calls": 0, "errors": 0, "total": 0.0, "rows": 0,
+                "samples": deque(maxlen=SAMPLES_PER_FINGERPRINT), "callers": set(),
+            }
+        stats["calls"] += 1
+        stats["errors"] += int(error)
+        stats["total"] += seconds
+        stats["rows"] += max(rowcount, 0)
+        stats["samples"].append(seconds)
+        stats["callers"].add(where)
+        entry = (seconds, now, key, where, rowcount, error)
+        # 小顶堆只保留最慢的 N 条
+        if len(_slowest) < SLOWEST_QUERIES:
+            heapq.heappush(_slowest, entry)
+        elif seconds > _slowest[0][0]:
+            heapq.heapreplace(_slowest, entry)
+        _recent.append((now, key, seconds, rowcount, where, error))
+
+
+def fingerprint_summary() -> List[Dict]:
+    """Per fingerprint call count and p50/p95/p99 latency in milliseconds, slowest p95 first"""
+    with _lock:
+        items = [(key, dict(stats, samples=list(stats["samples"]), callers=sorted(stats["callers"])))
+                 for key, stats in _by_fingerprint.items()]
+    summary = []
+    for key, stats in items:
+        p50, p95, p99 = np.percentile(stats["samples"], [50, 95, 99]) * 1000
+        summary.append({
+            "Fingerprint": key,
+            "Calls": stats["calls"],
+            "Errors": stats["errors"],
+            "p50 (ms)": round(float(p50), 2),
+            "p95 (ms)": round(float(p95), 2),
+            "p99 (ms)": round(float(p99), 2),
+            "Avg Rows": round(stats["rows"] / stats["calls"], 1),
+            "Total (s)": round(stats["total"], 3),
+            "Callers": ", ".join(stats["callers"]),
+        })
+    return sorted(summary, key=lambda row: row["p95 (ms)"], reverse=True)
+
+
+def slowest_queries() -> List[Dict]:
+    with _lock:
+        entries = sorted(_slowest, reverse=True)
+    return [
+        {"Duration (ms)": round(seconds * 1000, 2), "Time": time.strftime("%H:%M:%S", time.localtime(ts)),
+         "Fingerprint": key, "Caller": where, "Rows": rowcount, "Error": error}
+        for seconds, ts, key, where, rowcount, error in entries
+    ]
+
+
+def recent_queries(limit: int = 50):
+    """Most recent statements as (timestamp, fingerprint, seconds, rowcount, caller, error), newest first"""
+    with _lock:
+        return list(_recent)[-limit:][::-1]
+
+
+def reset():
+    with _lock:
+        _by_fingerprint.clear()
+        _slowest.clear()
+        _recent.clear()
@@ -1,6 +1,8 @@
 import streamlit as st
+from utils.dataset_store import enable_copy_on_write, to_arrow_backed
 
 def init_session_state():
+    enable_copy_on_write()
     defaults = {
         "source_type": None,           # 'file' | 'api' | 'notion'
         "file_type": None,             # 'csv' | 'excel'
@@ -70,9 +72,11 @@ def add_dataset(table_name: str, raw_df, source_info: dict = None):
     if "datasets" not in st.session_state:
         st.session_state["datasets"] = {}
     
+    raw_df = to_arrow_backed(raw_df)
     st.session_state["datasets"][table_name] = {
         "raw": raw_df,
-        "clean": raw_df.copy(), 
+        # 浅拷贝 + Copy-on-Write：clean 与 raw 共享列数据，只有被修改的列才会复制
+        "clean": raw_df.copy(deep=False), 
         "source_info": source_info or {}
     }
 
@@ -94,6 +98,7 @@ def get_dataset_names():
 
 def update_clean_data(table_name: str, clean_df):
     if table_name in st.session_state.get("datasets", {}):
+        clean_df = to_arrow_backed(clean_df)
         st.session_state["datasets"][table_name]["clean"] = clean_df
         
         if st.session_state.get("current_table") == table_name:
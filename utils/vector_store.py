@@ -0,0 +1,122 @@
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from langchain.vectorstores import FAISS
+from utils.config import get_config
+from utils.index_profiles import configure_search
+
+STORE_DIR = "vectorstore/uploads"
+DEFAULT_MAX_DISK_BYTES = 2 * 1024 ** 3
+DEFAULT_MAX_LOADED = 4
+
+_lock = threading.Lock()
+_key_locks = {}
+_loaded: "OrderedDict[str, FAISS]" = OrderedDict()
+
+
+def content_hash(data: bytes) -> str:
+    """Key an uploaded file by the SHA-256 of its bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _index_dir(key: str) -> str:
+    return os.path.join(STORE_DIR, key)
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _remember(key: str, db: FAISS):
+    max_loaded = int(get_config("vectorstore", "max_loaded_indexes", DEFAULT_MAX_LOADED))
+    with _lock:
+        _loaded[key] = db
+        _loaded.move_to_end(key)
+        while len(_loaded) > max_loaded:
+            _loaded.popitem(last=False)
+
+
+def _key_lock(key: str) -> threading.Lock:
+    with _lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def list_indexes():
+    """Saved indexes as (key, size_bytes, last_used) sorted from least to most recently used"""
+    if not os.path.isdir(STORE_DIR):
+        return []
+    entries = []
+    for key in os.listdir(STORE_DIR):
+        if key.endswith(".tmp"):
+            continue
+        path = _index_dir(key)
+        if not os.path.isfile(os.path.join(path, "index.faiss")):
+            continue
+        entries.append((key, _dir_size(path), os.path.getmtime(path)))
+    return sorted(entries, key=lambda e: e[2])
+
+
+def evict_indexes(keep: str = None, max_bytes: int = None) -> int:
+    """Delete least recently used indexes until the store fits in max_bytes; returns bytes freed"""
+    if max_bytes is None:
+        max_bytes = int(get_config("vectorstore", "max_disk_bytes", DEFAULT_MAX_DISK_BYTES))
+    entries = list_indexes()
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for key, size, _ in entries:
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        shutil.rmtree(_index_dir(key), ignore_errors=True)
+        _loaded.pop(key, None)
+        total -= size
+        freed += size
+    return freed
+
+
+def load_or_build_index(data: bytes, build_fn: Callable[[], FAISS], embeddings,
+                        key: Optional[str] = None) -> Tuple[FAISS, str, bool]:
+    """Return (index, content_key, built) reusing a saved index when the content was seen before.
+
+    Pass key when the caller already knows content_hash(data), to skip hashing the bytes again.
+    """
+    key = key or content_hash(data)
+    path = _index_dir(key)
+    # 同一文件只构建一次，不同文件之间互不阻塞
+    with _key_lock(key):
+        db = _loaded.get(key)
+        if db is not None:
+            _remember(key, db)
+            os.utime(path)
+            return db, key, False
+
+        if os.path.isfile(os.path.join(path, "index.faiss")):
+            db = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+            configure_search(db.index)
+            # mtime 记录最近使用时间，用于 LRU 淘汰
+            os.utime(path)
+            _remember(key, db)
+            return db, key, False
+
+        db = build_fn()
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        db.save_local(tmp_path)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+        _remember(key, db)
+        with _lock:
+            evict_indexes(keep=key)
+        return db, key, True